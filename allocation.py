@@ -0,0 +1,245 @@
+# allocation.py
+
+import re
+import time
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from models import db, Semester, Allocation, AllocationRound
+from seats import BULK_CHUNK, BULK_RETRIES, SeatUpdateError, write_plan
+from seat_events import record_changes
+from utils import chunked
+
+FIELDS = ["applicant", "rank", "status", "semester_id", "preference"]
+PREFERENCE_SEPARATORS = re.compile(r"[;|,\s]+")
+
+
+class Applicant:
+    """One ranked applicant and their semester preferences, best first."""
+
+    __slots__ = ("index", "applicant", "rank", "preferences", "status",
+                 "semester_id", "preference")
+
+    def __init__(self, applicant, rank, preferences, index=None):
+        self.index = index
+        self.applicant = applicant
+        self.rank = rank
+        self.preferences = preferences
+        self.status = None
+        self.semester_id = None
+        self.preference = None
+
+    def as_dict(self):
+        return {
+            "applicant": self.applicant,
+            "rank": self.rank,
+            "status": self.status,
+            "semester_id": self.semester_id,
+            "preference": self.preference,
+        }
+
+
+def parse_applicant(record, index=None, max_preferences=10):
+    """
+    Build an Applicant from ``{"applicant", "rank", "preferences"}``, where
+    preferences is a list of semester ids or, from CSV, a string such as
+    "12;7;31". Repeated ids keep their first position. Raises ValueError.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("each applicant must be an object")
+    try:
+        applicant = str(record["applicant"]).strip()
+        rank = int(record["rank"])
+        raw = record["preferences"]
+    except KeyError as err:
+        raise ValueError(f"missing field {err.args[0]}") from None
+    except (TypeError, ValueError):
+        raise ValueError("rank must be an integer") from None
+    if not applicant or len(applicant) > 64:
+        raise ValueError("applicant must be 1-64 characters")
+    if isinstance(raw, str):
+        raw = [p for p in PREFERENCE_SEPARATORS.split(raw) if p]
+    if not isinstance(raw, list):
+        raise ValueError("preferences must be a list")
+    try:
+        preferences = list(dict.fromkeys(int(p) for p in raw))
+    except (TypeError, ValueError):
+        raise ValueError("preferences must be semester ids") from None
+    if not preferences or len(preferences) > max_preferences:
+        raise ValueError(f"give 1-{max_preferences} preferences")
+    return Applicant(applicant, rank, preferences, index=index)
+
+
+def parse_applicants(records, max_preferences=10):
+    """
+    Parse ``(index, record)`` pairs. Returns the applicants and a list of
+    ``{"index", "error"}`` for records that were rejected, including any
+    repeat of an applicant id.
+    """
+    applicants, invalid, seen = [], [], set()
+    for index, record in records:
+        try:
+            a = parse_applicant(record, index, max_preferences)
+        except ValueError as err:
+            invalid.append({"index": index, "error": str(err)})
+            continue
+        if a.applicant in seen:
+            invalid.append({"index": index, "error": "duplicate applicant"})
+            continue
+        seen.add(a.applicant)
+        applicants.append(a)
+    return applicants, invalid
+
+
+# ---------------- Engine ----------------
+
+def allocate(applicants, capacity):
+    """
+    Merit-order allocation: in rank order (ties by applicant id), each
+    applicant takes their most-preferred semester that still has a seat.
+    With one merit list shared by every course this is the stable
+    matching deferred acceptance would reach, in a single pass of at most
+    applicants x preferences dict lookups. Decrements ``capacity`` in place
+    and returns ``{semester_id: seats taken}``.
+    """
+    taken = {}
+    for a in sorted(applicants, key=lambda a: (a.rank, a.applicant)):
+        for position, semester_id in enumerate(a.preferences, 1):
+            left = capacity.get(semester_id, 0)
+            if left > 0:
+                capacity[semester_id] = left - 1
+                taken[semester_id] = taken.get(semester_id, 0) + 1
+                a.status = "allocated"
+                a.semester_id = semester_id
+                a.preference = position
+                break
+        else:
+            a.status = "unallocated"
+            a.semester_id = a.preference = None
+    return taken
+
+
+def _mark_held(applicants):
+    """Flag applicants placed by an earlier round; returns the rest."""
+    held = {}
+    names = [a.applicant for a in applicants]
+    for chunk in chunked(names, BULK_CHUNK):
+        rows = db.session.execute(
+            select(Allocation.applicant, Allocation.semester_id,
+                   Allocation.preference)
+            .where(Allocation.applicant.in_(chunk))
+        )
+        held.update((r.applicant, r) for r in rows)
+    pending = []
+    for a in applicants:
+        row = held.get(a.applicant)
+        if row is None:
+            pending.append(a)
+            continue
+        a.status = "held"
+        a.semester_id = row.semester_id
+        a.preference = row.preference
+    return pending
+
+
+def _read_capacity(applicants):
+    """``{semester_id: (available_seats, version)}`` for every preference."""
+    ids = list({sid for a in applicants for sid in a.preferences})
+    current = {}
+    for chunk in chunked(ids, BULK_CHUNK):
+        rows = db.session.execute(
+            select(Semester.id, Semester.available_seats, Semester.version)
+            .where(Semester.id.in_(chunk))
+        )
+        current.update((r.id, (r.available_seats or 0, r.version))
+                       for r in rows)
+    return current
+
+
+class RoundResult:
+    """Outcome of one allocation round, committed or not."""
+
+    def __init__(self, applicants, pending, current, taken, dry_run):
+        self.applicants = applicants
+        self.dry_run = dry_run
+        self.round_id = None
+        self.seconds = 0.0
+        self.semesters = {
+            sid: {"semester_id": sid, "available_before": current[sid][0],
+                  "allocated": n, "available_after": current[sid][0] - n}
+            for sid, n in sorted(taken.items())
+        }
+        self.unknown = sorted({sid for a in pending
+                               for sid in a.preferences} - current.keys())
+
+    def counts(self):
+        counts = {"allocated": 0, "unallocated": 0, "held": 0}
+        for a in self.applicants:
+            counts[a.status] += 1
+        return counts
+
+    def summary(self):
+        return {
+            "round_id": self.round_id,
+            "dry_run": self.dry_run,
+            "applicants": len(self.applicants),
+            **self.counts(),
+            "semesters": list(self.semesters.values()),
+            "unknown_semesters": self.unknown,
+            "seconds": round(self.seconds, 3),
+        }
+
+
+def run_round(applicants, dry_run=False, user_id=None):
+    """
+    Allocate seats to ``applicants`` against the live seat counts in one
+    transaction. Applicants placed by earlier rounds keep their seat, so
+    re-running with a longer list or after seats were added is an
+    incremental round. Concurrent seat edits re-run the allocation
+    (optimistic retry, as bulk updates do). With ``dry_run`` nothing is
+    written. The caller commits.
+    """
+    started = time.perf_counter()
+    pending = _mark_held(applicants)
+    for _ in range(BULK_RETRIES):
+        current = _read_capacity(pending)
+        capacity = {sid: seats for sid, (seats, _) in current.items()}
+        taken = allocate(pending, capacity)
+        result = RoundResult(applicants, pending, current, taken,
+                             dry_run)
+        if dry_run:
+            break
+        written = write_plan({sid: (capacity[sid], current[sid][1])
+                              for sid in taken})
+        if len(written) == len(taken):
+            _record_round(result, written, user_id)
+            break
+        db.session.rollback()
+    else:
+        raise SeatUpdateError("Semesters kept changing; retry the round", 409)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def _record_round(result, written, user_id):
+    record_changes(written)
+    counts = result.counts()
+    allocation_round = AllocationRound(
+        user_id=user_id, applicants=len(result.applicants),
+        allocated=counts["allocated"],
+    )
+    db.session.add(allocation_round)
+    db.session.flush()
+    result.round_id = allocation_round.id
+    rows = [{"round_id": allocation_round.id, "applicant": a.applicant,
+             "rank": a.rank, "semester_id": a.semester_id,
+             "preference": a.preference}
+            for a in result.applicants if a.status == "allocated"]
+    try:
+        for chunk in chunked(rows, 5000):
+            db.session.execute(insert(Allocation), chunk)
+    except IntegrityError:
+        db.session.rollback()
+        raise SeatUpdateError(
+            "Another round placed some of these applicants; retry", 409
+        ) from None
@@ -1,73 +1,298 @@
 # app.py
 
 import os
+import json
+import time
 import click
+from contextlib import contextmanager
 
 from flask import (
-    Flask, render_template, request, jsonify,
-    redirect, session, flash
+    Flask, Blueprint, current_app, render_template, request, jsonify,
+    redirect, session, flash, stream_with_context
 )
 from flask.cli import with_appcontext
+from markupsafe import Markup
 from flask_jwt_extended import (
     JWTManager, create_access_token,
-    jwt_required, get_jwt
+    jwt_required, get_jwt, get_jwt_identity
 )
 
 from config import Config
-from models import db, User, Stream, Course, Semester
+from sqlalchemy import select
+
+from models import db, User, Stream, Course, Semester, Allocation, AllocationRound
+from engines import configure_engines, read_all
+from catalog_cache import CatalogCache
+from passwords import PasswordHasher, HashPoolBusy
+from metrics import Metrics
+from traffic import TrafficRecorder
+from assets import Assets, build_assets, build_warnings
+from car_price import CarPriceService
+import car_price as car_price_model
+from unemployment import UnemploymentAnalytics
+from semester_search import SemesterIndex, SearchQuery
+from seat_events import (SeatHub, HubFull, RESYNC, events_since,
+                         record_resync)
+from seat_history import (
+    HistoryWriter, GRANULARITIES, semester_series, group_series,
+    recent_changes
+)
+from seats import (
+    SeatUpdateError, BulkItem, set_seats, adjust_seats,
+    bulk_update, apply_rule
+)
+import allocation
+import migrate
+import db_audit
+import catalog_io
 import seed  # our standalone seed.py
 
-app = Flask(__name__)
-app.config.from_object(Config)
-
-db.init_app(app)
-jwt = JWTManager(app)
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: single process, no lock needed
+    fcntl = None
 
+jwt = JWTManager()
+catalog = CatalogCache()
+hub = SeatHub()
+hasher = PasswordHasher()
+metrics = Metrics()
+traffic = TrafficRecorder()
+history = HistoryWriter()
+assets = Assets()
+car_price = CarPriceService()
+unemployment = UnemploymentAnalytics()
+semester_index = SemesterIndex()
 
-# ---------------- Auto‐Seed on First Request ----------------
+bp = Blueprint("main", __name__, cli_group=None)
 
-_seeded = False
 
-@app.before_request
-def _auto_seed_once():
-    global _seeded
-    if _seeded:
-        return
+# ---------------- CLI Commands ----------------
 
-    app.logger.info(f"🔍 Using DB URI: {app.config['SQLALCHEMY_DATABASE_URI']}")
+@bp.cli.command("init-db")
+@with_appcontext
+def init_db():
+    """Create all tables."""
     db.create_all()
+    click.echo("✅ Database initialized")
 
-    # Only seed if no users exist
-    if User.query.count() == 0:
-        seed.seed_users()
-        seed.seed_demo_data()
-        db.session.commit()
-        app.logger.info("✅ Auto‐seeded database on startup")
 
-    _seeded = True
+@bp.cli.command("upgrade-db")
+@with_appcontext
+def cli_upgrade_db():
+    """Add tables, columns and indexes missing from an existing database."""
+    changes = migrate.upgrade()
+    for change in changes:
+        click.echo(f"  + {change}")
+    click.echo(f"✅ upgrade-db complete ({len(changes)} changes)")
 
 
-# ---------------- CLI Commands ----------------
+@bp.cli.command("db-audit")
+@click.option("-v", "--verbose", is_flag=True, help="Print every plan.")
+@with_appcontext
+def cli_db_audit(verbose):
+    """EXPLAIN the API's queries and fail on unexpected full table scans."""
+    failed = 0
+    for query, plan, scans in db_audit.run_audit():
+        mark = "❌" if scans else "✅"
+        click.echo(f"{mark} {query.name}")
+        for line in (plan if verbose else scans):
+            click.echo(f"     {line}")
+        failed += bool(scans)
+    if failed:
+        click.echo(f"{failed} queries scan full tables or fail to plan; "
+                   f"run 'flask upgrade-db' to add missing indexes")
+        raise SystemExit(1)
+    click.echo("✅ db-audit passed")
+
+
+@bp.cli.command("import-catalog")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]),
+              help="Defaults to the file extension.")
+@click.option("--chunk-size", default=5000, show_default=True)
+@with_appcontext
+def cli_import_catalog(path, fmt, chunk_size):
+    """Upsert streams, courses and semester seats from CSV or JSONL.
+
+    Columns: stream, course, semester, available_seats.
+    """
+    fmt = catalog_io.detect_format(path, fmt)
+    importer = catalog_io.CatalogImporter(chunk_size=chunk_size)
+
+    def on_error(line_no, err):
+        click.echo(f"  ! line {line_no}: skipped ({err})", err=True)
+
+    def on_progress(stats):
+        click.echo(f"  {stats.rows} rows ({stats.rate:,.0f} rows/s)")
 
-@app.cli.command("init-db")
+    with open(path, newline="", encoding="utf-8") as fh:
+        stats = importer.run(catalog_io.iter_records(fh, fmt),
+                             on_error=on_error, on_progress=on_progress)
+
+    # open seat streams reload; caches drop on every worker
+    record_resync()
+    db.session.commit()
+    catalog.bump()
+    click.echo(f"✅ import-catalog complete: {stats.rows} rows, "
+               f"{stats.streams} new streams, {stats.courses} new courses, "
+               f"{stats.skipped} skipped, {stats.rate:,.0f} rows/s")
+
+
+@bp.cli.command("export-catalog")
+@click.argument("path", default="-")
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]),
+              help="Defaults to the file extension (csv for stdout).")
+@click.option("--batch-size", default=2000, show_default=True)
 @with_appcontext
-def init_db():
-    """Create all tables."""
-    db.create_all()
-    click.echo("✅ Database initialized")
+def cli_export_catalog(path, fmt, batch_size):
+    """Stream the whole catalog to CSV or JSONL (PATH or - for stdout)."""
+    fmt = catalog_io.detect_format(path, fmt)
+    started = time.perf_counter()
+    with click.open_file(path, "w", encoding="utf-8") as fh:
+        count = catalog_io.write_records(
+            fh, catalog_io.iter_catalog(batch_size), fmt
+        )
+    elapsed = time.perf_counter() - started
+    click.echo(f"✅ export-catalog complete: {count} rows "
+               f"({count / elapsed if elapsed else 0:,.0f} rows/s)", err=True)
 
 
-@app.cli.command("seed-db")
+@bp.cli.command("build-assets")
+@click.option("--clean", is_flag=True,
+              help="Delete outputs of earlier builds (breaks cached pages).")
+@with_appcontext
+def cli_build_assets(clean):
+    """Fingerprint, precompress and resize static files into ASSETS_DIR."""
+    for warning in build_warnings():
+        click.echo(f"⚠️ {warning}", err=True)
+    manifest, removed = build_assets(
+        current_app.static_folder, current_app.config["ASSETS_DIR"],
+        clean=clean,
+        widths=current_app.config["ASSETS_IMAGE_WIDTHS"],
+        quality=current_app.config["ASSETS_IMAGE_QUALITY"],
+    )
+    out_dir = current_app.config["ASSETS_DIR"]
+    for name, entry in sorted(manifest.items()):
+        extras = [f"{enc} {os.path.getsize(os.path.join(out_dir, path)):,}B"
+                  for enc, path in entry.get("encodings", {}).items()]
+        extras += [f"{v['width']}w {v['type'].split('/')[1]} "
+                   f"{os.path.getsize(os.path.join(out_dir, v['path'])):,}B"
+                   for v in entry.get("variants", [])]
+        click.echo(f"{name} → {entry['path']} ({entry['size']:,}B"
+                   + "".join(f", {e}" for e in extras) + ")")
+    if removed:
+        click.echo(f"🧹 removed {len(removed)} stale files")
+    click.echo(f"✅ build-assets complete: {len(manifest)} assets")
+
+
+@bp.cli.command("train-car-model")
+@click.argument("csv_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--out", type=click.Path(dir_okay=False),
+              help="Artifact path (default: CAR_PRICE_MODEL).")
+@with_appcontext
+def cli_train_car_model(csv_path, out):
+    """Fit the car-price model on a local CSV, save and verify its artifact."""
+    out = out or current_app.config["CAR_PRICE_MODEL"]
+    model = car_price_model.train(csv_path)
+    model.save(out)
+    m = model.metrics
+    click.echo(f"✅ trained on {m['rows']} rows: R2 {m['r2']:.3f}, "
+               f"MAE {m['mae']:.3f} → {out}")
+    try:
+        drift = car_price_model.verify(out, csv_path)
+    except ValueError as err:
+        raise click.ClickException(str(err))
+    click.echo(f"✅ artifact matches scikit-learn (max diff {drift:.1e})")
+
+
+@bp.cli.command("ingest-unemployment")
+@click.argument("csv_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--chunk-size", default=50000, show_default=True)
+@click.option("--rebuild", is_flag=True,
+              help="Drop the cache first (for sources edited in place).")
+@with_appcontext
+def cli_ingest_unemployment(csv_path, chunk_size, rebuild):
+    """Add new rows of an unemployment CSV to the analytics cache."""
+    if rebuild:
+        unemployment.store.clear()
+    try:
+        stats = unemployment.store.ingest(csv_path, chunksize=chunk_size)
+    except RuntimeError as err:
+        raise click.ClickException(str(err))
+    click.echo(f"✅ ingest-unemployment: {stats['added']} new rows, "
+               f"{stats['duplicates']} duplicates, {stats['skipped']} "
+               f"already ingested, {stats['rows']} total "
+               f"({stats['seconds']:.2f}s)")
+
+
+@bp.cli.command("allocate-seats")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]),
+              help="Defaults to the file extension.")
+@click.option("--dry-run", is_flag=True, help="Plan the round, write nothing.")
+@click.option("--out", type=click.Path(dir_okay=False),
+              help="Write every applicant's outcome to this CSV.")
+@with_appcontext
+def cli_allocate_seats(path, fmt, dry_run, out):
+    """Allocate seats to ranked applicants from CSV or JSONL.
+
+    Columns: applicant, rank, preferences (semester ids, best first, e.g.
+    "12;7;31"). Applicants placed by an earlier round keep their seat.
+    """
+    fmt = catalog_io.detect_format(path, fmt)
+    with open(path, newline="", encoding="utf-8") as fh:
+        applicants, invalid = allocation.parse_applicants(
+            catalog_io.iter_records(fh, fmt),
+            current_app.config["ALLOCATION_MAX_PREFERENCES"],
+        )
+    for item in invalid:
+        click.echo(f"  ! line {item['index']}: skipped ({item['error']})",
+                   err=True)
+
+    try:
+        result = allocation.run_round(applicants, dry_run=dry_run)
+    except SeatUpdateError as err:
+        db.session.rollback()
+        raise click.ClickException(err.message)
+    if dry_run:
+        db.session.rollback()
+    else:
+        db.session.commit()
+        if result.semesters:
+            catalog.bump()
+
+    if result.unknown:
+        click.echo(f"⚠️ {len(result.unknown)} unknown semester ids in "
+                   f"preferences, e.g. {result.unknown[:5]}", err=True)
+    if out:
+        with open(out, "w", newline="", encoding="utf-8") as fh:
+            catalog_io.write_records(
+                fh, (a.as_dict() for a in sorted(
+                    applicants, key=lambda a: (a.rank, a.applicant))),
+                "csv", fields=allocation.FIELDS,
+            )
+    counts = result.counts()
+    label = "dry run" if dry_run else f"round {result.round_id}"
+    click.echo(f"✅ allocate-seats ({label}): {counts['allocated']} allocated, "
+               f"{counts['unallocated']} unallocated, {counts['held']} held "
+               f"from earlier rounds, {len(invalid)} skipped, "
+               f"{len(result.semesters)} semesters ({result.seconds:.2f}s)")
+
+
+@bp.cli.command("seed-db")
 @with_appcontext
 def cli_seed_db():
     """Insert default users and demo data."""
     seed.seed_users()
     seed.seed_demo_data()
+    record_resync()
     db.session.commit()
+    catalog.bump()
     click.echo("✅ seed-db complete")
 
 
-@app.cli.command("full-refresh")
+@bp.cli.command("full-refresh")
 @with_appcontext
 def cli_full_refresh():
     """Drop all tables, recreate schema, then seed everything."""
@@ -75,32 +300,36 @@ def cli_full_refresh():
     db.create_all()
     seed.seed_users()
     seed.seed_demo_data()
+    record_resync()
     db.session.commit()
+    catalog.bump()
     click.echo("✅ full-refresh complete")
 
-@app.route('/seed-all')
+@bp.route('/seed-all')
 def seed_all():
     db.create_all()
     if User.query.count() == 0:
         from seed import seed_users, seed_demo_data
         seed_users()
         seed_demo_data()
+        record_resync()
         db.session.commit()
+        catalog.bump()
         return '✅ Database seeded', 200
     return '⚠️ Already seeded', 200
 
 
 # ---------------- Routes ----------------
 
-@app.route("/")
+@bp.route("/")
 def home():
     return redirect("/login")
 
-@app.route("/ping")
+@bp.route("/ping")
 def ping():
     return "App is alive!"
 
-@app.route("/login", methods=["GET", "POST"])
+@bp.route("/login", methods=["GET", "POST"])
 def login_page():
     if request.method == "POST":
         username      = request.form.get("username", "").strip()
@@ -111,10 +340,20 @@ def login_page():
             username=username, role=selected_role
         ).first()
 
-        if not user or not user.check_password(password):
+        if not user or not hasher.verify(user.password_hash, password):
             return render_template("login.html",
                                    error="Invalid credentials or role")
 
+        # upgrade hashes made with an older method or cost factor; under
+        # load skip it rather than fail a login that already verified, a
+        # later login upgrades the hash instead
+        if hasher.needs_rehash(user.password_hash):
+            try:
+                user.password_hash = hasher.hash(password)
+                db.session.commit()
+            except HashPoolBusy:
+                pass
+
         token = create_access_token(
             identity=str(user.id),
             additional_claims={"role": user.role}
@@ -129,78 +368,708 @@ def login_page():
     return render_template("login.html")
 
 
-@app.route("/admin")
+def _render_catalog_bootstrap(streams):
+    """
+    The stream picker, so the dashboards need no request before the first
+    choice. A stream's courses and semesters load from
+    /api/catalog?stream_id= once it is picked.
+    """
+    return Markup(render_template(
+        "_catalog_bootstrap.html", streams=json.loads(streams.body)
+    ))
+
+
+def catalog_bootstrap(role):
+    """The bootstrap fragment for ``role``, re-rendered when streams change."""
+    streams = catalog.get(("streams",), load_streams)
+    return catalog.get_fragment(
+        ("bootstrap", role), streams, _render_catalog_bootstrap
+    )
+
+
+@bp.route("/admin")
 def admin_page():
     token = session.get("jwt", "")
     role  = session.get("role")
     if not token or role != "admin":
         flash("Unauthorized: Admin access required.")
         return redirect("/login")
-    return render_template("admin.html", jwt=token)
+    return render_template("admin.html", jwt=token,
+                           catalog_bootstrap=catalog_bootstrap(role))
 
 
-@app.route("/faculty")
+@bp.route("/faculty")
 def faculty_page():
     token = session.get("jwt", "")
     role  = session.get("role")
     if not token or role != "faculty":
         flash("Unauthorized: Faculty access required.")
         return redirect("/login")
-    return render_template("faculty.html")
+    return render_template("faculty.html",
+                           catalog_bootstrap=catalog_bootstrap(role))
 
 
 # ---------------- API Endpoints ----------------
 
-@app.route("/api/streams")
+def catalog_response(key, loader):
+    """
+    Serve a cached catalog payload with a strong ETag. Clients revalidating
+    with If-None-Match get a 304 straight from the cache, without a query.
+    """
+    entry = catalog.get(key, loader)
+    if entry.compressible and "gzip" in request.accept_encodings:
+        resp = current_app.response_class(entry.gzipped,
+                                          mimetype="application/json")
+        resp.content_encoding = "gzip"
+        resp.set_etag(entry.etag + "-gz")
+    else:
+        resp = current_app.response_class(entry.body,
+                                          mimetype="application/json")
+        resp.set_etag(entry.etag)
+    resp.vary.add("Accept-Encoding")
+    resp.cache_control.no_cache = True
+    return resp.make_conditional(request)
+
+
+def load_catalog_tree(stream_id=None):
+    """
+    Build the Stream → Course → Semester tree from one joined query,
+    ordered so the nesting can be assembled in a single pass.
+    """
+    stmt = (
+        select(
+            Stream.id, Stream.name,
+            Course.id, Course.name,
+            Semester.id, Semester.number, Semester.available_seats,
+            Semester.version,
+        )
+        .outerjoin(Course, Course.stream_id == Stream.id)
+        .outerjoin(Semester, Semester.course_id == Course.id)
+        .order_by(Stream.id, Course.id, Semester.number, Semester.id)
+    )
+    if stream_id is not None:
+        stmt = stmt.where(Stream.id == stream_id)
+
+    tree = []
+    stream = course = None
+    for s_id, s_name, c_id, c_name, sem_id, number, seats, version \
+            in read_all(stmt):
+        if stream is None or stream["id"] != s_id:
+            stream = {"id": s_id, "name": s_name, "courses": []}
+            tree.append(stream)
+            course = None
+        if c_id is None:
+            continue
+        if course is None or course["id"] != c_id:
+            course = {"id": c_id, "name": c_name, "semesters": []}
+            stream["courses"].append(course)
+        if sem_id is not None:
+            course["semesters"].append(
+                {"id": sem_id, "number": number,
+                 "available_seats": seats, "version": version}
+            )
+    return tree
+
+
+@bp.route("/api/catalog")
+def get_catalog():
+    stream_id = request.args.get("stream_id", type=int)
+    return catalog_response(
+        ("catalog", stream_id),
+        lambda: load_catalog_tree(stream_id)
+    )
+
+
+def load_streams():
+    return [{"id": s.id, "name": s.name}
+            for s in read_all(select(Stream.id, Stream.name)
+                              .order_by(Stream.id))]
+
+
+@bp.route("/api/streams")
 def get_streams():
-    return jsonify([{"id": s.id, "name": s.name}
-                    for s in Stream.query.all()])
+    return catalog_response(("streams",), load_streams)
 
 
-@app.route("/api/courses/<int:stream_id>")
+@bp.route("/api/courses/<int:stream_id>")
 def get_courses(stream_id):
-    return jsonify([{"id": c.id, "name": c.name}
-                    for c in Course.query.filter_by(stream_id=stream_id)])
+    return catalog_response(
+        ("courses", stream_id),
+        lambda: [{"id": c.id, "name": c.name}
+                 for c in read_all(select(Course.id, Course.name)
+                                   .where(Course.stream_id == stream_id)
+                                   .order_by(Course.id))]
+    )
 
 
-@app.route("/api/semesters/<int:course_id>")
+@bp.route("/api/semesters/<int:course_id>")
 def get_semesters(course_id):
-    return jsonify([
-        {"id": s.id, "number": s.number, "available_seats": s.available_seats}
-        for s in Semester.query.filter_by(course_id=course_id)
-    ])
+    return catalog_response(
+        ("semesters", course_id),
+        lambda: [
+            {"id": s.id, "number": s.number,
+             "available_seats": s.available_seats, "version": s.version}
+            for s in read_all(
+                select(Semester.id, Semester.number,
+                       Semester.available_seats, Semester.version)
+                .where(Semester.course_id == course_id)
+                .order_by(Semester.number, Semester.id)
+            )
+        ]
+    )
+
+
+@bp.route("/api/semesters/search")
+def search_semesters():
+    """
+    Find semesters across the whole catalog. Filters: stream_id, stream
+    (name), course_id, course (name prefix), min_number/max_number,
+    min_seats/max_seats. sort: id, seats, number or course, - for
+    descending. Pass next_cursor back as ?cursor= for the next page.
+    """
+    try:
+        query = SearchQuery.from_args(
+            request.args,
+            default_limit=current_app.config["SEARCH_DEFAULT_LIMIT"],
+            max_limit=current_app.config["SEARCH_MAX_LIMIT"],
+        )
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+    return jsonify(semester_index.search(query))
+
+
+@bp.route("/api/seats/stream")
+def stream_seats():
+    """
+    Server-Sent Events feed of committed seat changes for one course or
+    stream. Reconnecting clients resume from Last-Event-ID. Each stream
+    holds a worker thread, so past SEAT_EVENTS_MAX_SUBSCRIBERS per worker
+    it answers 503 with Retry-After.
+    """
+    course_id = request.args.get("course_id", type=int)
+    stream_id = request.args.get("stream_id", type=int)
+    last_id   = request.headers.get("Last-Event-ID", type=int)
+    heartbeat = current_app.config["SEAT_EVENTS_HEARTBEAT"]
+
+    try:
+        sub = hub.subscribe(course_id=course_id, stream_id=stream_id)
+    except HubFull:
+        return (jsonify({"error": "Too many live connections, "
+                                  "retry shortly"}),
+                503, {"Retry-After": "5"})
+    backlog = []
+    if last_id is not None:
+        backlog = events_since(last_id, course_id, stream_id)
+    db.session.remove()  # don't hold a connection for the stream's life
+
+    def format_event(event):
+        if event is RESYNC:
+            return "event: resync\ndata: {}\n\n"
+        return (f"id: {event['id']}\nevent: seats\n"
+                f"data: {json.dumps(event)}\n\n")
+
+    def generate():
+        seen = last_id or 0
+        try:
+            yield "retry: 2000\n\n"
+            for event in backlog:
+                if event is not RESYNC:
+                    seen = event["id"]
+                yield format_event(event)
+            while True:
+                event = sub.get(timeout=heartbeat)
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is not RESYNC:
+                    if event["id"] <= seen:
+                        continue  # already sent from the backlog
+                    seen = event["id"]
+                yield format_event(event)
+        finally:
+            hub.unsubscribe(sub)
+
+    resp = current_app.response_class(stream_with_context(generate()),
+                              mimetype="text/event-stream")
+    resp.cache_control.no_cache = True
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
+
+
+def _require_admin():
+    if get_jwt().get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+    return None
+
+
+def _seat_error(err):
+    body = {"error": err.message}
+    if err.semester is not None:
+        body["available"] = err.semester.available_seats
+        body["version"]   = err.semester.version
+    return jsonify(body), err.status
 
 
-@app.route("/api/update_seats", methods=["POST"])
+@bp.route("/api/update_seats", methods=["POST"])
 @jwt_required()
 def update_seats():
-    claims = get_jwt()
-    if claims.get("role") != "admin":
-        return jsonify({"error": "Unauthorized"}), 403
+    denied = _require_admin()
+    if denied:
+        return denied
 
     data = request.get_json(silent=True) or {}
     try:
         semester_id = int(data["semester_id"])
         new_count   = int(data["count"])
-    except (KeyError, ValueError):
+        version     = data.get("version")
+        version     = None if version is None else int(version)
+    except (KeyError, TypeError, ValueError):
         return jsonify({"error": "Invalid input"}), 400
 
-    sem = Semester.query.get(semester_id)
-    if not sem:
-        return jsonify({"error": "Semester not found"}), 404
+    try:
+        available, version = set_seats(semester_id, new_count, version)
+    except SeatUpdateError as err:
+        db.session.rollback()
+        return _seat_error(err)
 
-    sem.available_seats = new_count
     db.session.commit()
+    catalog.bump()
     return jsonify({
         "message": "Updated successfully",
         "semester_id": semester_id,
-        "available": new_count
+        "available": available,
+        "version": version
     })
 
 
+def _int_or_none(value):
+    return None if value is None else int(value)
+
+
+def _parse_bulk_items(raw_items):
+    """Turn request items into BulkItems; malformed ones are marked invalid."""
+    items, invalid = [], []
+    for i, raw in enumerate(raw_items):
+        try:
+            item = BulkItem(int(raw["semester_id"]),
+                            count=_int_or_none(raw.get("count")),
+                            delta=_int_or_none(raw.get("delta")),
+                            index=i)
+        except (KeyError, TypeError, ValueError):
+            invalid.append({"index": i, "status": "invalid"})
+            continue
+        if (item.count is None) == (item.delta is None) or \
+                (item.count is not None and item.count < 0):
+            invalid.append({"index": i, "semester_id": item.semester_id,
+                            "status": "invalid"})
+            continue
+        items.append(item)
+    return items, invalid
+
+
+@bp.route("/api/update_seats/bulk", methods=["POST"])
+@jwt_required()
+def bulk_update_seats():
+    """
+    Apply many seat changes in one transaction. Accepts either
+    {"items": [{"semester_id", "count"|"delta"}, ...], "atomic": bool}
+    or a rule {"course_id"|"stream_id", "count"|"delta"}.
+    """
+    denied = _require_admin()
+    if denied:
+        return denied
+
+    data = request.get_json(silent=True) or {}
+    try:
+        count = _int_or_none(data.get("count"))
+        delta = _int_or_none(data.get("delta"))
+        course_id = _int_or_none(data.get("course_id"))
+        stream_id = _int_or_none(data.get("stream_id"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid input"}), 400
+
+    try:
+        if "items" in data:
+            raw_items = data["items"]
+            if not isinstance(raw_items, list):
+                return jsonify({"error": "items must be a list"}), 400
+            if len(raw_items) > current_app.config["BULK_SEATS_MAX_ITEMS"]:
+                return jsonify({"error": "Too many items"}), 413
+            items, invalid = _parse_bulk_items(raw_items)
+            if invalid and data.get("atomic"):
+                return jsonify({"error": "Invalid items",
+                                "results": invalid}), 400
+            bulk_update(items, atomic=bool(data.get("atomic")))
+            results = sorted(invalid + [item.as_dict() for item in items],
+                             key=lambda r: r["index"])
+            updated = sum(item.status == "updated" for item in items)
+        else:
+            if (course_id is None) == (stream_id is None) or \
+                    (count is None) == (delta is None):
+                return jsonify({"error": "Give items, or one of course_id/"
+                                         "stream_id with count or delta"}), 400
+            rows, skipped = apply_rule(count=count, delta=delta,
+                                       course_id=course_id,
+                                       stream_id=stream_id)
+            results = [{"semester_id": r.id, "status": "updated",
+                        "available": r.available_seats, "version": r.version}
+                       for r in rows]
+            results += [{"semester_id": sid, "status": "insufficient"}
+                        for sid in skipped]
+            updated = len(rows)
+    except SeatUpdateError as err:
+        db.session.rollback()
+        return _seat_error(err)
+
+    db.session.commit()
+    if updated:
+        catalog.bump()
+    return jsonify({"updated": updated, "results": results})
+
+
+def _change_seats(semester_id, sign):
+    denied = _require_admin()
+    if denied:
+        return denied
+
+    data = request.get_json(silent=True) or {}
+    try:
+        count = int(data.get("count", 1))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid input"}), 400
+    if count <= 0:
+        return jsonify({"error": "Count must be positive"}), 400
+
+    try:
+        available, version = adjust_seats(semester_id, sign * count)
+    except SeatUpdateError as err:
+        db.session.rollback()
+        return _seat_error(err)
+
+    db.session.commit()
+    catalog.bump()
+    return jsonify({
+        "semester_id": semester_id,
+        "available": available,
+        "version": version
+    })
+
+
+@bp.route("/api/semesters/<int:semester_id>/reserve", methods=["POST"])
+@jwt_required()
+def reserve_seats(semester_id):
+    return _change_seats(semester_id, -1)
+
+
+@bp.route("/api/semesters/<int:semester_id>/release", methods=["POST"])
+@jwt_required()
+def release_seats(semester_id):
+    return _change_seats(semester_id, 1)
+
+
+# ---------------- Seat History ----------------
+
+def _history_range():
+    """
+    Parse ?bucket=hour|day&since=&until= (epoch seconds). Defaults to the
+    last 7 days of hours or 90 days of days, ending now.
+    """
+    granularity = request.args.get("bucket", "hour")
+    if granularity not in GRANULARITIES:
+        return None, (jsonify({"error": "bucket must be hour or day"}), 400)
+    until = request.args.get("until", type=float) or time.time()
+    default_days = 7 if granularity == "hour" else 90
+    since = request.args.get("since", type=float)
+    if since is None:
+        since = until - default_days * 86400
+    max_days = current_app.config["SEAT_HISTORY_MAX_DAYS"][granularity]
+    if since >= until or until - since > max_days * 86400:
+        return None, (jsonify({"error": f"Range must be positive and at most "
+                                        f"{max_days} days for {granularity}"
+                                        f" buckets"}), 400)
+    width = GRANULARITIES[granularity]
+    # widen to whole buckets so the first and last are not cut off
+    return (granularity, int(since // width * width), int(until)), None
+
+
+def _series_response(points, window, **ids):
+    granularity, since, until = window
+    return jsonify({**ids, "bucket": granularity, "since": since,
+                    "until": until, "points": points})
+
+
+@bp.route("/api/history/semesters/<int:semester_id>")
+def semester_history(semester_id):
+    """Seat availability of one semester per hour or day."""
+    window, error = _history_range()
+    if error:
+        return error
+    points = semester_series(semester_id, *window)
+    return _series_response(points, window, semester_id=semester_id)
+
+
+@bp.route("/api/history/courses/<int:course_id>")
+def course_history(course_id):
+    """Total seats across a course's semesters per hour or day."""
+    window, error = _history_range()
+    if error:
+        return error
+    points = group_series("course", course_id, *window)
+    return _series_response(points, window, course_id=course_id)
+
+
+@bp.route("/api/history/streams/<int:stream_id>")
+def stream_history(stream_id):
+    """Total seats across a stream's semesters per hour or day."""
+    window, error = _history_range()
+    if error:
+        return error
+    points = group_series("stream", stream_id, *window)
+    return _series_response(points, window, stream_id=stream_id)
+
+
+@bp.route("/api/history/semesters/<int:semester_id>/changes")
+@jwt_required()
+def semester_changes(semester_id):
+    """Who changed a semester and when, newest first; page with ?before=id."""
+    denied = _require_admin()
+    if denied:
+        return denied
+    limit = min(request.args.get("limit", 100, type=int), 1000)
+    changes = recent_changes(semester_id,
+                             before_id=request.args.get("before", type=int),
+                             limit=limit)
+    return jsonify({"semester_id": semester_id, "changes": changes})
+
+
+# ---------------- Seat Allocation ----------------
+
+def _round_dict(r):
+    return {"round_id": r.id, "created_at": r.created_at,
+            "user_id": r.user_id, "applicants": r.applicants,
+            "allocated": r.allocated}
+
+
+@bp.route("/api/allocation/rounds", methods=["POST"])
+@jwt_required()
+def allocate_round():
+    """
+    Run an allocation round: {"applicants": [{"applicant", "rank",
+    "preferences": [semester_id, ...]}, ...], "dry_run": bool}. Applicants
+    placed by an earlier round keep their seat; malformed ones are skipped
+    and listed under "invalid".
+    """
+    denied = _require_admin()
+    if denied:
+        return denied
+
+    data = request.get_json(silent=True) or {}
+    raw = data.get("applicants")
+    if not isinstance(raw, list):
+        return jsonify({"error": "applicants must be a list"}), 400
+    if len(raw) > current_app.config["ALLOCATION_MAX_APPLICANTS"]:
+        return jsonify({"error": "Too many applicants"}), 413
+    applicants, invalid = allocation.parse_applicants(
+        enumerate(raw), current_app.config["ALLOCATION_MAX_PREFERENCES"]
+    )
+    dry_run = bool(data.get("dry_run"))
+
+    try:
+        result = allocation.run_round(applicants, dry_run=dry_run,
+                                      user_id=int(get_jwt_identity()))
+    except SeatUpdateError as err:
+        db.session.rollback()
+        return _seat_error(err)
+
+    if dry_run:
+        db.session.rollback()
+    else:
+        db.session.commit()
+        if result.semesters:
+            catalog.bump()
+    return jsonify({**result.summary(), "invalid": invalid,
+                    "results": [a.as_dict() for a in applicants]})
+
+
+@bp.route("/api/allocation/rounds")
+@jwt_required()
+def allocation_rounds():
+    """Committed rounds, newest first."""
+    denied = _require_admin()
+    if denied:
+        return denied
+    rows = read_all(select(AllocationRound)
+                    .order_by(AllocationRound.id.desc()).limit(50))
+    return jsonify([_round_dict(r) for r in rows])
+
+
+@bp.route("/api/allocation/rounds/<int:round_id>")
+@jwt_required()
+def allocation_round(round_id):
+    """Seats given out by one round, in insert order; page with ?after=id."""
+    denied = _require_admin()
+    if denied:
+        return denied
+    limit = min(request.args.get("limit", 1000, type=int), 10000)
+    after = request.args.get("after", 0, type=int)
+    rows = read_all(select(Allocation)
+                    .where(Allocation.round_id == round_id,
+                           Allocation.id > after)
+                    .order_by(Allocation.id).limit(limit))
+    return jsonify({"round_id": round_id, "allocations": [
+        {"id": r.id, "applicant": r.applicant, "rank": r.rank,
+         "semester_id": r.semester_id, "preference": r.preference}
+        for r in rows
+    ]})
+
+
+# ---------------- Reports ----------------
+
+REPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _catalog_validators(resp, version):
+    """
+    ETag and Last-Modified for a payload built from catalog ``version``
+    (time_ns of the bump). HTTP dates have whole seconds, so Last-Modified
+    is only sent once that second is over: any later bump then lands in a
+    later second and can't hide behind an If-Modified-Since.
+    """
+    modified = version // 1_000_000_000
+    if time.time() >= modified + 1:
+        resp.last_modified = modified
+    if request.if_none_match:
+        return request.if_none_match.contains(resp.get_etag()[0])
+    since = request.if_modified_since
+    return since is not None and modified <= since.timestamp()
+
+
+@bp.route("/api/reports/inventory")
+@jwt_required()
+def inventory_report():
+    """
+    Every semester's seat count with per-course, per-stream and grand
+    totals, streamed as CSV or ?format=ndjson. Honors If-None-Match and
+    If-Modified-Since against the catalog version.
+    """
+    denied = _require_admin()
+    if denied:
+        return denied
+    fmt = request.args.get("format", "csv")
+    if fmt not in REPORT_FORMATS:
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    version = catalog.version()
+    resp = current_app.response_class(mimetype=REPORT_FORMATS[fmt])
+    resp.set_etag(f"inventory-{fmt}-{version}")
+    resp.cache_control.private = True
+    resp.cache_control.no_cache = True
+    if _catalog_validators(resp, version):
+        resp.status_code = 304
+        return resp
+
+    resp.response = stream_with_context(catalog_io.iter_encoded(
+        catalog_io.iter_inventory(), fmt, fields=catalog_io.REPORT_FIELDS
+    ))
+    resp.headers["Content-Disposition"] = (
+        f"attachment; filename=inventory-{version}.{fmt}"
+    )
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
+
+
+# ---------------- Predictions ----------------
+
+@bp.route("/api/predict/car_price", methods=["POST"])
+def predict_car_price():
+    """
+    Predict selling prices. Send one car as an object, or many as
+    {"items": [...]}; single cars are micro-batched with concurrent ones.
+    """
+    if car_price.model is None:
+        return jsonify({"error": car_price.error}), 503
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Invalid input"}), 400
+
+    if "items" not in data:
+        try:
+            price = car_price.predict_one(data)
+        except ValueError as err:
+            return jsonify({"error": str(err)}), 400
+        except TimeoutError:
+            return jsonify({"error": "Prediction timed out"}), 503
+        return jsonify({"price": price})
+
+    items = data["items"]
+    if not isinstance(items, list):
+        return jsonify({"error": "items must be a list"}), 400
+    if len(items) > car_price.max_items:
+        return jsonify({"error": "Too many items"}), 413
+    try:
+        prices = car_price.predict(items)
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+    return jsonify({"prices": prices})
+
+
+# ---------------- Unemployment Analytics ----------------
+
+def _unemployment_view(name):
+    results = unemployment.get()
+    if results is None:
+        return None, (jsonify({"error": "No unemployment data; run "
+                                        "`flask ingest-unemployment`"}), 503)
+    return results[name], None
+
+
+@bp.route("/api/unemployment/summary")
+def unemployment_summary():
+    view, error = _unemployment_view("summary")
+    return error or jsonify(view)
+
+
+@bp.route("/api/unemployment/regions")
+def unemployment_regions():
+    """Mean rates per region, highest unemployment first; ?top=N."""
+    view, error = _unemployment_view("regions")
+    if error:
+        return error
+    top = request.args.get("top", type=int)
+    return jsonify(view[:top] if top else view)
+
+
+@bp.route("/api/unemployment/areas")
+def unemployment_areas():
+    view, error = _unemployment_view("areas")
+    return error or jsonify(view)
+
+
+@bp.route("/api/unemployment/monthly")
+def unemployment_monthly():
+    """Mean rates per month, overall or for ?region=."""
+    region = request.args.get("region")
+    if region is None:
+        view, error = _unemployment_view("monthly")
+        return error or jsonify(view)
+    view, error = _unemployment_view("region_monthly")
+    if error:
+        return error
+    if region not in view:
+        return jsonify({"error": "Unknown region"}), 404
+    return jsonify(view[region])
+
+
+@bp.route("/api/unemployment/correlation")
+def unemployment_correlation():
+    view, error = _unemployment_view("correlation")
+    return error or jsonify(view)
+
+
 # ---------------- Auth Utilities ----------------
 
-@app.route("/register", methods=["GET", "POST"])
+@bp.route("/register", methods=["GET", "POST"])
 def register():
     if request.method == "POST":
         username = request.form["username"].strip()
@@ -215,8 +1084,8 @@ def register():
             return render_template("register.html",
                                    error="Username already exists")
 
-        user = User(username=username, role=role)
-        user.set_password(password)
+        user = User(username=username, role=role,
+                    password_hash=hasher.hash(password))
         db.session.add(user)
         db.session.commit()
 
@@ -226,7 +1095,7 @@ def register():
     return render_template("register.html")
 
 
-@app.route("/forgot", methods=["GET", "POST"])
+@bp.route("/forgot", methods=["GET", "POST"])
 def forgot_password():
     if request.method == "POST":
         username     = request.form["username"].strip()
@@ -237,7 +1106,7 @@ def forgot_password():
             return render_template("forgot.html",
                                    error="User not found")
 
-        user.set_password(new_password)
+        user.password_hash = hasher.hash(new_password)
         db.session.commit()
 
         flash("Password reset successful! Please login with your new password.")
@@ -246,13 +1115,138 @@ def forgot_password():
     return render_template("forgot.html")
 
 
-@app.route("/logout")
+# Page to re-render when the hashing pool turns a form submission away
+_BUSY_TEMPLATES = {
+    "main.login_page": "login.html",
+    "main.register": "register.html",
+    "main.forgot_password": "forgot.html",
+}
+
+
+@bp.errorhandler(HashPoolBusy)
+def hash_pool_busy(_err):
+    template = _BUSY_TEMPLATES.get(request.endpoint, "login.html")
+    body = render_template(template,
+                           error="Server is busy, please try again shortly")
+    return body, 503, {"Retry-After": "2"}
+
+
+@bp.route("/logout")
 def logout():
     session.pop("jwt", None)
     flash("Logged out successfully.")
     return redirect("/login")
 
 
+# ---------------- Health ----------------
+
+@bp.route("/assets/<path:filename>")
+def serve_asset(filename):
+    """Fingerprinted build output; safe to cache forever."""
+    return assets.send(filename)
+
+
+@bp.route("/ready")
+def ready():
+    """Readiness probe: 200 only once startup() has finished in this process."""
+    if not current_app.extensions.get("startup_complete"):
+        return jsonify({"status": "starting"}), 503
+    return jsonify({"status": "ready",
+                    "catalog_version": catalog.version()})
+
+
+@bp.route("/metrics")
+def metrics_endpoint():
+    """Prometheus scrape target; counters are per gunicorn worker (pid)."""
+    if not metrics.enabled:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return current_app.response_class(
+        metrics.render(), mimetype="text/plain; version=0.0.4"
+    )
+
+
+# ---------------- Startup ----------------
+
+@contextmanager
+def _startup_lock(path):
+    """Serialize startup across processes (workers without preload)."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def startup(app):
+    """
+    One-time startup work: upgrade the schema, seed an empty database and
+    warm the catalog cache. create_app() runs it, so with gunicorn's
+    preload it happens once in the master before workers fork; it is
+    idempotent and safe to repeat.
+    """
+    if app.extensions.get("startup_complete"):
+        return
+
+    with app.app_context(), _startup_lock(app.config["STARTUP_LOCK_FILE"]):
+        app.logger.info(
+            f"🔍 Using DB URI: {app.config['SQLALCHEMY_DATABASE_URI']}"
+        )
+        migrate.upgrade()
+
+        # Only seed if no users exist
+        if User.query.count() == 0:
+            seed.seed_users()
+            seed.seed_demo_data()
+            db.session.commit()
+            catalog.bump()
+            app.logger.info("✅ Auto‐seeded database on startup")
+
+        # Forked workers inherit these entries copy-on-write
+        for role in ("admin", "faculty"):
+            catalog_bootstrap(role)
+        semester_index.get()
+        db.session.remove()
+
+        # Don't hand pooled connections over to forked workers; the warm-up
+        # above ran on the read bind as well as the primary
+        for engine in db.engines.values():
+            engine.dispose()
+
+    app.extensions["startup_complete"] = True
+
+
+# ---------------- App Factory ----------------
+
+def create_app(config_object=Config):
+    app = Flask(__name__)
+    app.config.from_object(config_object)
+
+    db.init_app(app)
+    configure_engines(app)
+    jwt.init_app(app)
+    catalog.init_app(app)
+    hub.init_app(app)
+    hasher.init_app(app)
+    metrics.init_app(app)
+    traffic.init_app(app)
+    history.init_app(app)
+    assets.init_app(app)
+    car_price.init_app(app)
+    unemployment.init_app(app)
+    semester_index.init_app(app)
+
+    app.register_blueprint(bp)
+    startup(app)
+    return app
+
+
+app = create_app()
+
+
 # ---------------- Main ----------------
 
 if __name__ == "__main__":
@@ -0,0 +1,323 @@
+# assets.py
+
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import re
+import time
+
+from flask import abort, request, send_from_directory, url_for
+
+try:
+    from PIL import Image
+except ImportError:  # no responsive variants; originals are still hashed
+    Image = None
+
+try:
+    import brotli
+except ImportError:  # gzip copies only
+    brotli = None
+
+from utils import write_atomic
+
+MANIFEST = "manifest.json"
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".map"}
+IMAGES = {".jpg", ".jpeg", ".png", ".webp"}
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+CSS_DECLARATION = re.compile(r"([\w-]+\s*:\s*)([^;{}]*url\([^;{}]*);")
+CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+CSS_RULE = re.compile(r"([^{}@;]+)\{([^{}]*url\([^{}]*)\}")
+
+
+# ---------------- Build ----------------
+
+def _fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+class AssetBuilder:
+    """
+    Copies ``static/`` into ``out_dir`` under content-hashed names, with
+    gzip/brotli siblings for text assets and downscaled WebP/JPEG variants
+    for images. CSS is rewritten to point at the hashed images, so its
+    own hash changes whenever an image does.
+    """
+
+    def __init__(self, static_dir, out_dir, widths=(640, 1280, 1920),
+                 quality=80):
+        self.static_dir = static_dir
+        self.out_dir = out_dir
+        self.widths = widths
+        self.quality = quality
+        self.manifest = {}
+        self.written = set()
+
+    def _emit(self, name, data):
+        """Write ``data`` as ``stem.<hash>.ext`` and return that file name."""
+        stem, ext = os.path.splitext(name)
+        hashed = f"{stem}.{_fingerprint(data)}{ext}"
+        path = os.path.join(self.out_dir, hashed)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not os.path.exists(path):
+            write_atomic(path, lambda fh: fh.write(data))
+        self.written.add(hashed)
+        return hashed
+
+    def _compress(self, hashed, data):
+        encodings = {}
+        copies = [("gzip", ".gz",
+                   lambda: gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            copies.append(("br", ".br",
+                           lambda: brotli.compress(data, quality=11)))
+        for encoding, suffix, compress in copies:
+            packed = compress()
+            if len(packed) >= len(data):
+                continue
+            write_atomic(os.path.join(self.out_dir, hashed + suffix),
+                         lambda fh: fh.write(packed))
+            self.written.add(hashed + suffix)
+            encodings[encoding] = hashed + suffix
+        return encodings
+
+    def _variants(self, name, data):
+        """Downscaled WebP and JPEG copies, widest first; [] without Pillow."""
+        if Image is None:
+            return []
+        stem = os.path.splitext(name)[0]
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+            variants = []
+            for width in sorted(self.widths, reverse=True):
+                if width > img.width:
+                    continue
+                height = round(img.height * width / img.width)
+                resized = img.resize((width, height), Image.LANCZOS)
+                for fmt, ext, mimetype in (("WEBP", ".webp", "image/webp"),
+                                           ("JPEG", ".jpg", "image/jpeg")):
+                    out = io.BytesIO()
+                    resized.convert("RGB").save(out, fmt, quality=self.quality,
+                                                optimize=True)
+                    variants.append({
+                        "width": width, "type": mimetype,
+                        "path": self._emit(f"{stem}-{width}w{ext}",
+                                           out.getvalue()),
+                    })
+        return variants
+
+    def _css_asset(self, ref):
+        """The manifest entry a url() reference points at, if any."""
+        name = ref.split("?")[0].removeprefix("/static/").lstrip("/")
+        return self.manifest.get(name)
+
+    def _image_urls(self, ref, width=None):
+        """
+        (JPEG, WebP) URLs of a url() reference at ``width``, the widest
+        variants when None or when the image has no such width. The hashed
+        original stands in for a missing type; None if not an asset.
+        """
+        entry = self._css_asset(ref)
+        if entry is None:
+            return None
+        found = {}
+        for v in entry.get("variants") or []:
+            if width is None or v["width"] == width:
+                found.setdefault(v["type"], "/assets/" + v["path"])
+        if width is not None and not found:
+            return self._image_urls(ref)
+        original = "/assets/" + entry["path"]
+        return (found.get("image/jpeg", original),
+                found.get("image/webp", original))
+
+    def _rewrite_css(self, css):
+        """
+        Point url() references at hashed assets. A declaration that uses an
+        image with variants is repeated: first with the widest JPEG, then
+        with an image-set() preferring WebP; browsers that don't understand
+        image-set() keep the first. Each narrower width gets a copy of the
+        rule under @media (max-width), so small screens fetch small files.
+        """
+        def declaration(match, width=None, indent="  "):
+            prop, value = match.groups()
+
+            def fallback(m):
+                urls = self._image_urls(m.group(2), width)
+                return f"url('{urls[0]}')" if urls else m.group(0)
+
+            def image_set(m):
+                urls = self._image_urls(m.group(2), width)
+                if not urls or urls[0] == urls[1]:
+                    return fallback(m)
+                return (f"image-set(url('{urls[1]}') type('image/webp'), "
+                        f"url('{urls[0]}') type('image/jpeg'))")
+
+            plain = CSS_URL.sub(fallback, value)
+            modern = CSS_URL.sub(image_set, value)
+            if modern == plain:
+                return f"{prop}{plain};"
+            return f"{prop}{plain};\n{indent}{prop}{modern};"
+
+        def narrower_widths(value):
+            """Variant widths below the widest of each image in ``value``."""
+            widths = set()
+            for m in CSS_URL.finditer(value):
+                entry = self._css_asset(m.group(2)) or {}
+                sizes = sorted({v["width"] for v in entry.get("variants", [])})
+                widths.update(sizes[:-1])
+            return widths
+
+        def rule(match):
+            selector, body = match.groups()
+            out = selector + "{" + CSS_DECLARATION.sub(declaration, body) + "}"
+            found = list(CSS_DECLARATION.finditer(body))
+            widths = set()
+            for m in found:
+                widths |= narrower_widths(m.group(2))
+            # narrowest last, so it wins where several queries match
+            for width in sorted(widths, reverse=True):
+                copies = [declaration(m, width, indent="    ")
+                          for m in found if width in narrower_widths(m.group(2))]
+                out += (f"\n\n@media (max-width: {width}px) {{\n"
+                        f"  {CSS_COMMENT.sub('', selector).strip()} {{\n    "
+                        + "\n    ".join(copies) + "\n  }\n}")
+            return out
+
+        return CSS_RULE.sub(rule, css)
+
+    def build(self):
+        files = []
+        for root, _, names in os.walk(self.static_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                files.append(os.path.relpath(path, self.static_dir)
+                             .replace(os.sep, "/"))
+        # images first, so stylesheets can be rewritten to their hashes
+        files.sort(key=lambda n: (os.path.splitext(n)[1].lower() not in IMAGES,
+                                  n))
+
+        for name in files:
+            with open(os.path.join(self.static_dir, name), "rb") as fh:
+                data = fh.read()
+            ext = os.path.splitext(name)[1].lower()
+            if ext == ".css":
+                data = self._rewrite_css(data.decode("utf-8")).encode("utf-8")
+            entry = {"path": self._emit(name, data), "size": len(data)}
+            if ext in COMPRESSIBLE:
+                entry["encodings"] = self._compress(entry["path"], data)
+            if ext in IMAGES:
+                entry["variants"] = self._variants(name, data)
+            self.manifest[name] = entry
+
+        manifest_path = os.path.join(self.out_dir, MANIFEST)
+        data = json.dumps({"built_at": time.time(), "assets": self.manifest},
+                          indent=2, sort_keys=True).encode("utf-8")
+        write_atomic(manifest_path, lambda fh: fh.write(data))
+        return self.manifest
+
+    def clean(self):
+        """Delete files no longer named by the manifest; returns their names."""
+        removed = []
+        for root, _, names in os.walk(self.out_dir):
+            for name in names:
+                rel = os.path.relpath(os.path.join(root, name), self.out_dir)
+                rel = rel.replace(os.sep, "/")
+                if rel != MANIFEST and rel not in self.written:
+                    os.remove(os.path.join(root, name))
+                    removed.append(rel)
+        return removed
+
+
+# ---------------- Serving ----------------
+
+class Assets:
+    """
+    Serves the build output at /assets with year-long immutable caching,
+    picking a precompressed copy when the client accepts it. While a
+    manifest exists, ``url_for('static', filename=...)`` in templates
+    resolves to the hashed file; without one it falls back to /static.
+    """
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        self._mtime = None
+        self._checked = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["assets"] = self
+        self.out_dir = app.config["ASSETS_DIR"]
+        self.max_age = app.config["ASSETS_MAX_AGE"]
+        self._load()
+        app.jinja_env.globals["url_for"] = self.url_for
+
+    def _load(self):
+        """(Re)read the manifest when a build has replaced it."""
+        path = os.path.join(self.out_dir, MANIFEST)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            self.manifest, self._mtime = {}, None
+            return
+        if mtime != self._mtime:
+            with open(path) as fh:
+                self.manifest = json.load(fh)["assets"]
+            self._mtime = mtime
+
+    def _entry(self, filename):
+        now = time.monotonic()
+        if now - self._checked > 2:
+            self._checked = now
+            self._load()
+        return self.manifest.get(filename)
+
+    def url_for(self, endpoint, **values):
+        if endpoint == "static":
+            entry = self._entry(values.get("filename"))
+            if entry is not None:
+                values["filename"] = entry["path"]
+                return url_for("main.serve_asset", **values)
+        return url_for(endpoint, **values)
+
+    def send(self, filename):
+        if filename == MANIFEST or filename.endswith((".gz", ".br", ".tmp")):
+            abort(404)
+        mimetype = None
+        served = filename
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encoding in request.accept_encodings and \
+                    os.path.exists(os.path.join(self.out_dir, filename + suffix)):
+                served = filename + suffix
+                break
+        if served != filename:
+            mimetype = mimetypes.guess_type(filename)[0]
+
+        resp = send_from_directory(self.out_dir, served, mimetype=mimetype,
+                                   conditional=True, max_age=self.max_age)
+        if served != filename:
+            resp.content_encoding = "br" if served.endswith(".br") else "gzip"
+        resp.vary.add("Accept-Encoding")
+        resp.cache_control.public = True
+        resp.cache_control.immutable = True
+        return resp
+
+
+def build_warnings():
+    """Optional packages whose absence limits what a build emits."""
+    warnings = []
+    if Image is None:
+        warnings.append("Pillow not installed: no resized/WebP variants")
+    if brotli is None:
+        warnings.append("brotli not installed: gzip copies only")
+    return warnings
+
+
+def build_assets(static_dir, out_dir, clean=False, **options):
+    """Build ``out_dir`` from ``static_dir``; returns (manifest, removed)."""
+    builder = AssetBuilder(static_dir, out_dir, **options)
+    manifest = builder.build()
+    removed = builder.clean() if clean else []
+    return manifest, removed
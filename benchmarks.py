@@ -0,0 +1,1031 @@
+# benchmarks.py
+"""
+Load and consistency checks that run against a throwaway SQLite database.
+
+    python benchmarks.py seat-stress --threads 16 --ops 200
+    python benchmarks.py login-storm --logins 32 --readers 8
+    python benchmarks.py mixed-rw --compare
+    python benchmarks.py replay --synthetic 5000 --target gunicorn
+    python benchmarks.py replay --log traffic.jsonl --baseline base.json
+    python benchmarks.py car-price --rows 2000 --threads 16
+    python benchmarks.py car-price-check
+    python benchmarks.py unemployment --rows 500000
+    python benchmarks.py allocation --applicants 100000 --preferences 10
+    python benchmarks.py search --semesters 300000
+    python benchmarks.py report --semesters 300000
+"""
+
+import argparse
+import csv
+import http.client
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+
+def make_app(workdir):
+    """Point the app at a fresh database inside ``workdir`` and seed it."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["CATALOG_VERSION_FILE"] = os.path.join(workdir, "catalog.version")
+    os.environ["STARTUP_LOCK_FILE"] = os.path.join(workdir, "startup.lock")
+
+    from app import app, startup
+    from flask_jwt_extended import create_access_token
+
+    startup(app)
+    with app.app_context():
+        token = create_access_token(
+            identity="1", additional_claims={"role": "admin"}
+        )
+    return app, {"Authorization": f"Bearer {token}"}
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of an unsorted list (``p`` in 0-100)."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))
+    return ordered[k]
+
+
+def summarize(name, latencies):
+    ms = [x * 1000 for x in latencies]
+    return (f"{name:<14} n={len(ms):<6} p50={percentile(ms, 50):7.1f}ms "
+            f"p95={percentile(ms, 95):7.1f}ms p99={percentile(ms, 99):7.1f}ms")
+
+
+def run_threads(n, target):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(n)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+# ---------------- Seat reservation stress ----------------
+
+def seat_stress(args):
+    """
+    Hammer one semester with concurrent reserve/release calls and check that
+    every accepted change is reflected exactly once in the final count.
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        app, auth = make_app(workdir)
+        client = app.test_client()
+        semester_id = 1
+
+        start = client.post("/api/update_seats", headers=auth, json={
+            "semester_id": semester_id, "count": args.seats
+        }).get_json()
+
+        applied = [0] * args.threads
+        accepted = [0] * args.threads
+        rejected = [0] * args.threads
+        errors = []
+
+        def worker(i):
+            rng = random.Random(i)
+            c = app.test_client()
+            for _ in range(args.ops):
+                count = rng.randint(1, 3)
+                action = "reserve" if rng.random() < 0.6 else "release"
+                res = c.post(f"/api/semesters/{semester_id}/{action}",
+                             headers=auth, json={"count": count})
+                if res.status_code == 200:
+                    accepted[i] += 1
+                    applied[i] += -count if action == "reserve" else count
+                elif res.status_code == 409:
+                    rejected[i] += 1
+                else:
+                    errors.append((res.status_code, res.get_data(as_text=True)))
+
+        elapsed = run_threads(args.threads, worker)
+
+        final = client.get("/api/semesters/1").get_json()
+        final = next(s for s in final if s["id"] == semester_id)
+
+        expected_seats = args.seats + sum(applied)
+        expected_version = start["version"] + sum(accepted)
+        total = args.threads * args.ops
+        print(f"{total} requests in {elapsed:.2f}s "
+              f"({total / elapsed:.0f} req/s), "
+              f"{sum(accepted)} applied, {sum(rejected)} rejected (409)")
+        print(f"seats: expected {expected_seats}, got {final['available_seats']}")
+        print(f"version: expected {expected_version}, got {final['version']}")
+
+        ok = (not errors
+              and final["available_seats"] == expected_seats
+              and final["version"] == expected_version
+              and final["available_seats"] >= 0)
+        if errors:
+            print(f"unexpected responses: {errors[:5]}")
+        print("✅ consistent" if ok else "❌ lost or double-counted updates")
+        return 0 if ok else 1
+
+
+# ---------------- Login storm ----------------
+
+def login_storm(args):
+    """
+    Fire concurrent logins while other threads read the catalog API, and
+    report latency for both. Shows how the hashing pool keeps API reads
+    responsive and sheds excess logins with 503s.
+    """
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.hash_workers)
+    os.environ["PASSWORD_HASH_QUEUE"] = str(args.hash_queue)
+    with tempfile.TemporaryDirectory() as workdir:
+        app, _ = make_app(workdir)
+        login_lat, api_lat = [], []
+        statuses = {}
+        done = threading.Event()
+
+        def login(i):
+            c = app.test_client()
+            for _ in range(args.rounds):
+                t = time.perf_counter()
+                res = c.post("/login", data={
+                    "username": "admin", "password": "admin123",
+                    "role": "admin",
+                })
+                login_lat.append(time.perf_counter() - t)
+                statuses[res.status_code] = statuses.get(res.status_code, 0) + 1
+
+        def read(i):
+            c = app.test_client()
+            while not done.is_set():
+                t = time.perf_counter()
+                c.get("/api/catalog")
+                api_lat.append(time.perf_counter() - t)
+
+        readers = [threading.Thread(target=read, args=(i,))
+                   for i in range(args.readers)]
+        for r in readers:
+            r.start()
+        elapsed = run_threads(args.logins, login)
+        done.set()
+        for r in readers:
+            r.join()
+
+        print(f"{args.logins} login threads x {args.rounds} rounds, "
+              f"{args.readers} API readers, {elapsed:.2f}s, "
+              f"hash pool {args.hash_workers}+{args.hash_queue}")
+        print(f"login statuses: {dict(sorted(statuses.items()))}")
+        print(summarize("login", login_lat))
+        print(summarize("/api/catalog", api_lat))
+        return 0
+
+
+# ---------------- Mixed read/write ----------------
+
+def mixed_rw(args):
+    """
+    Readers pull catalog/semester APIs while writers reserve and release
+    seats; every write invalidates the catalog cache, so most reads reach
+    the database. With --compare each SQLite profile runs in a fresh
+    interpreter, since engine settings are fixed at import time.
+    """
+    if args.compare:
+        for profile in ("default", "production"):
+            cmd = [sys.executable, __file__, "mixed-rw",
+                   "--profile", profile, "--seconds", str(args.seconds),
+                   "--readers", str(args.readers),
+                   "--writers", str(args.writers)]
+            subprocess.run(cmd, check=False)
+        return 0
+
+    os.environ["SQLITE_PROFILE"] = args.profile
+    with tempfile.TemporaryDirectory() as workdir:
+        app, auth = make_app(workdir)
+        stop = time.perf_counter() + args.seconds
+        read_lat, write_lat = [], []
+        failures = []
+
+        def reader(i):
+            rng = random.Random(i)
+            c = app.test_client()
+            while time.perf_counter() < stop:
+                path = rng.choice(["/api/catalog?stream_id=1",
+                                   "/api/semesters/1", "/api/semesters/2"])
+                t = time.perf_counter()
+                res = c.get(path)
+                read_lat.append(time.perf_counter() - t)
+                if res.status_code != 200:
+                    failures.append(res.status_code)
+
+        def writer(i):
+            rng = random.Random(1000 + i)
+            c = app.test_client()
+            while time.perf_counter() < stop:
+                action = rng.choice(["reserve", "release"])
+                t = time.perf_counter()
+                res = c.post(f"/api/semesters/{rng.randint(1, 16)}/{action}",
+                             headers=auth, json={"count": 1})
+                write_lat.append(time.perf_counter() - t)
+                if res.status_code not in (200, 409):
+                    failures.append(res.status_code)
+
+        def worker(i):
+            (writer if i < args.writers else reader)(i)
+
+        elapsed = run_threads(args.writers + args.readers, worker)
+        print(f"profile={args.profile}: "
+              f"{len(read_lat) / elapsed:.0f} reads/s, "
+              f"{len(write_lat) / elapsed:.0f} writes/s, "
+              f"{len(failures)} failed requests")
+        print("  " + summarize("reads", read_lat))
+        print("  " + summarize("writes", write_lat))
+        return 0
+
+
+# ---------------- Traffic replay ----------------
+
+# Admission-week request mix: (weight, route label, method, path, body)
+ADMISSION_WEEK_MIX = [
+    (25, "GET /api/catalog", "GET", "/api/catalog", None),
+    (20, "GET /api/semesters/<id>", "GET", "/api/semesters/{course}", None),
+    (10, "GET /api/courses/<id>", "GET", "/api/courses/{stream}", None),
+    (10, "GET /api/streams", "GET", "/api/streams", None),
+    (10, "POST /login", "POST", "/login", "login"),
+    (12, "POST /api/semesters/<id>/reserve", "POST",
+     "/api/semesters/{semester}/reserve", {"count": 1}),
+    (8, "POST /api/semesters/<id>/release", "POST",
+     "/api/semesters/{semester}/release", {"count": 1}),
+    (5, "POST /api/update_seats", "POST", "/api/update_seats", "update"),
+]
+
+DEMO_LOGIN = {"username": "admin", "password": "admin123", "role": "admin"}
+
+
+def synthetic_requests(n, seed=0):
+    """``n`` requests drawn from the admission-week mix (demo seed ids)."""
+    rng = random.Random(seed)
+    weights = [w for w, *_ in ADMISSION_WEEK_MIX]
+    for _ in range(n):
+        _, route, method, path, body = rng.choices(ADMISSION_WEEK_MIX,
+                                                   weights)[0]
+        semester = rng.randint(1, 52)
+        req = {"route": route, "method": method, "auth": method == "POST",
+               "path": path.format(course=rng.randint(1, 9),
+                                   stream=rng.randint(1, 3),
+                                   semester=semester)}
+        if body == "login":
+            req["form"], req["auth"] = DEMO_LOGIN, False
+        elif body == "update":
+            req["json"] = {"semester_id": semester,
+                           "count": rng.randint(10, 60)}
+        elif body is not None:
+            req["json"] = body
+        yield req
+
+
+def recorded_requests(path):
+    """
+    Requests from a TRAFFIC_CAPTURE log; form posts replay as demo login.
+    JSON requests whose body was not kept (only the seat APIs' are) are
+    skipped, since they can't be replayed faithfully.
+    """
+    from traffic import load_traffic
+
+    for rec in load_traffic(path):
+        if "shape" in rec and "json" not in rec:
+            continue
+        req = {"route": f"{rec['method']} {rec['endpoint']}",
+               "method": rec["method"], "path": rec["path"],
+               "auth": rec.get("auth", False)}
+        if "json" in rec:
+            req["json"] = rec["json"]
+        elif "form" in rec:
+            req["form"] = DEMO_LOGIN
+        yield req
+
+
+class ClientDriver:
+    """Sends requests through the Flask test client, in-process."""
+
+    def __init__(self, app, auth):
+        self.app = app
+        self.auth = auth
+        self.local = threading.local()
+
+    def send(self, req):
+        if not hasattr(self.local, "client"):
+            self.local.client = self.app.test_client()
+        res = self.local.client.open(
+            req["path"], method=req["method"],
+            headers=self.auth if req["auth"] else {},
+            json=req.get("json"), data=req.get("form"),
+        )
+        return res.status_code
+
+
+class HttpDriver:
+    """Sends requests over keep-alive HTTP, one connection per thread."""
+
+    def __init__(self, base_url, auth):
+        url = urllib.parse.urlsplit(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.auth = auth
+        self.local = threading.local()
+
+    def send(self, req):
+        if not hasattr(self.local, "conn"):
+            self.local.conn = http.client.HTTPConnection(
+                self.host, self.port, timeout=30
+            )
+        headers = dict(self.auth) if req["auth"] else {}
+        body = None
+        if "json" in req:
+            body = json.dumps(req["json"])
+            headers["Content-Type"] = "application/json"
+        elif "form" in req:
+            body = urllib.parse.urlencode(req["form"])
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        try:
+            self.local.conn.request(req["method"], req["path"], body, headers)
+            res = self.local.conn.getresponse()
+            res.read()
+            return res.status
+        except (OSError, http.client.HTTPException):
+            self.local.conn.close()
+            del self.local.conn
+            return 599
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(workdir, workers):
+    """Run the app under gunicorn.conf.py against the benchmark database."""
+    port = _free_port()
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+         "app:app"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL, stderr=open(
+            os.path.join(workdir, "gunicorn.log"), "w"),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/ready")
+            if conn.getresponse().status == 200:
+                return proc, base_url
+        except OSError:
+            pass
+        time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("gunicorn did not become ready")
+
+
+def replay_requests(driver, requests, threads):
+    """Drive ``requests`` from ``threads`` workers; return per-route stats."""
+    feed = iter(requests)
+    feed_lock = threading.Lock()
+    latencies, statuses = {}, {}
+
+    def worker(_):
+        while True:
+            with feed_lock:
+                req = next(feed, None)
+            if req is None:
+                return
+            t = time.perf_counter()
+            status = driver.send(req)
+            elapsed = time.perf_counter() - t
+            with feed_lock:
+                latencies.setdefault(req["route"], []).append(elapsed)
+                by_status = statuses.setdefault(req["route"], {})
+                by_status[status] = by_status.get(status, 0) + 1
+
+    elapsed = run_threads(threads, worker)
+    report = {"elapsed": elapsed, "routes": {}}
+    for route, lat in sorted(latencies.items()):
+        ms = [x * 1000 for x in lat]
+        report["routes"][route] = {
+            "count": len(ms),
+            "rps": len(ms) / elapsed,
+            "p50_ms": percentile(ms, 50),
+            "p95_ms": percentile(ms, 95),
+            "p99_ms": percentile(ms, 99),
+            "errors": sum(n for code, n in statuses[route].items()
+                          if code >= 500),
+            "statuses": {str(k): v for k, v in sorted(statuses[route].items())},
+        }
+    report["total_rps"] = sum(len(l) for l in latencies.values()) / elapsed
+    return report
+
+
+def print_report(report, baseline=None, threshold=0.2):
+    """Print the per-route table; return the routes that regressed."""
+    regressions = []
+    print(f"{'route':<36} {'n':>6} {'req/s':>8} {'p50':>8} {'p95':>8} "
+          f"{'p99':>8} {'5xx':>5}")
+    for route, r in report["routes"].items():
+        line = (f"{route:<36} {r['count']:>6} {r['rps']:>8.0f} "
+                f"{r['p50_ms']:>7.1f}ms {r['p95_ms']:>6.1f}ms "
+                f"{r['p99_ms']:>6.1f}ms {r['errors']:>5}")
+        base = (baseline or {}).get("routes", {}).get(route)
+        if base and base["p95_ms"] > 0:
+            change = r["p95_ms"] / base["p95_ms"] - 1
+            line += f"  p95 {change:+.0%}"
+            if change > threshold:
+                line += " ❌"
+                regressions.append(route)
+        print(line)
+    print(f"total: {report['total_rps']:.0f} req/s "
+          f"over {report['elapsed']:.2f}s")
+    if baseline:
+        change = report["total_rps"] / baseline["total_rps"] - 1
+        print(f"throughput vs baseline: {change:+.0%}")
+        if change < -threshold:
+            regressions.append("total throughput")
+    return regressions
+
+
+def replay(args):
+    """
+    Replay recorded traffic, or a synthetic admission-week mix, against
+    the test client or a local gunicorn, and optionally compare the
+    per-route numbers with a saved baseline.
+    """
+    if args.log:
+        requests = list(recorded_requests(args.log))
+    else:
+        requests = list(synthetic_requests(args.synthetic, args.seed))
+    if args.requests:
+        requests = list(itertools.islice(itertools.cycle(requests),
+                                         args.requests))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app, auth = make_app(workdir)
+        proc = None
+        if args.url:
+            driver = HttpDriver(args.url, auth)
+        elif args.target == "gunicorn":
+            proc, base_url = start_gunicorn(workdir, args.workers)
+            driver = HttpDriver(base_url, auth)
+        else:
+            driver = ClientDriver(app, auth)
+        try:
+            report = replay_requests(driver, requests, args.threads)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+    regressions = print_report(report, baseline, args.threshold)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"baseline saved to {args.save_baseline}")
+    if regressions:
+        print(f"❌ regressions: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+# ---------------- Car price inference ----------------
+
+CAR_NAMES = ["ritz", "sx4", "ciaz", "wagon r", "swift", "city", "corolla",
+             "innova", "verna", "i20", "brio", "fortuner", "jazz", "alto"]
+
+
+def make_car_fixture(path, rows, seed=0):
+    """Write a synthetic CSV shaped like the notebook's car dataset."""
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["Car_Name", "Year", "Selling_Price", "Present_Price",
+                         "Kms_Driven", "Fuel_Type", "Seller_Type",
+                         "Transmission", "Owner"])
+        for _ in range(rows):
+            year = rng.randint(2003, 2018)
+            present = round(rng.uniform(0.3, 30), 2)
+            kms = rng.randint(500, 200000)
+            fuel = rng.choice(["Petrol", "Diesel", "CNG"])
+            price = present * (0.9 - 0.04 * (2018 - year)) \
+                + (0.8 if fuel == "Diesel" else 0) + rng.gauss(0, 0.5)
+            writer.writerow([rng.choice(CAR_NAMES), year,
+                             round(max(price, 0.1), 2), present, kms, fuel,
+                             rng.choice(["Dealer", "Individual"]),
+                             rng.choice(["Manual", "Automatic"]),
+                             rng.choice([0, 0, 0, 1])])
+
+
+def car_price(args):
+    """
+    Train on a local fixture CSV, then compare predictions/sec for per-row
+    calls, explicit batches, and concurrent single requests coalesced by
+    the micro-batcher.
+    """
+    import car_price as cp
+
+    with tempfile.TemporaryDirectory() as workdir:
+        fixture = os.path.join(workdir, "cars.csv")
+        make_car_fixture(fixture, args.rows)
+        model = cp.train(fixture)
+        print(f"trained on {args.rows} fixture rows: "
+              f"R2 {model.metrics['r2']:.3f}, MAE {model.metrics['mae']:.3f}")
+        with open(fixture) as fh:
+            records = list(csv.DictReader(fh))
+        n = len(records)
+
+        t = time.perf_counter()
+        for record in records:
+            model.predict([record])
+        per_row = n / (time.perf_counter() - t)
+        print(f"{'per-row':<24} {per_row:>10,.0f} predictions/s")
+
+        for size in (args.batch, n):
+            t = time.perf_counter()
+            for i in range(0, n, size):
+                model.predict(records[i:i + size])
+            rate = n / (time.perf_counter() - t)
+            print(f"{f'batches of {size}':<24} {rate:>10,.0f} predictions/s "
+                  f"({rate / per_row:.1f}x)")
+
+        share = n // args.threads
+
+        def inline(i):
+            for record in records[i * share:(i + 1) * share]:
+                model.predict([record])
+
+        rate = share * args.threads / run_threads(args.threads, inline)
+        print(f"{'threads, inline':<24} {rate:>10,.0f} predictions/s "
+              f"({rate / per_row:.1f}x)")
+
+        batcher = cp.MicroBatcher(model.predict, max_batch=args.batch,
+                                  max_wait=args.wait_ms / 1000)
+
+        def coalesced(i):
+            for record in records[i * share:(i + 1) * share]:
+                batcher.submit(record).result()
+
+        rate = share * args.threads / run_threads(args.threads, coalesced)
+        print(f"{'threads, micro-batched':<24} {rate:>10,.0f} predictions/s "
+              f"({rate / per_row:.1f}x, "
+              f"avg batch {batcher.rows / batcher.batches:.1f})")
+    return 0
+
+
+CAR_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "car_data_fixture.csv")
+
+
+def car_price_check(args):
+    """
+    Train on the committed fixture CSV, save the artifact, and check that
+    serving it reproduces LinearRegression.predict for every row.
+    """
+    import car_price as cp
+
+    with tempfile.TemporaryDirectory() as workdir:
+        artifact = os.path.join(workdir, "car_price_model.json")
+        cp.train(args.csv).save(artifact)
+        try:
+            drift = cp.verify(artifact, args.csv, tolerance=args.tolerance)
+        except ValueError as err:
+            print(f"FAIL: {err}")
+            return 1
+    print(f"artifact matches LinearRegression on {args.csv} "
+          f"(max diff {drift:.1e})")
+    return 0
+
+
+# ---------------- Unemployment analytics ----------------
+
+REGIONS = {"Andhra Pradesh": "South", "Assam": "Northeast", "Bihar": "East",
+           "Delhi": "North", "Goa": "West", "Gujarat": "West",
+           "Haryana": "North", "Kerala": "South", "Maharashtra": "West",
+           "Odisha": "East", "Punjab": "North", "Tamil Nadu": "South",
+           "Tripura": "Northeast", "Uttar Pradesh": "North",
+           "West Bengal": "East"}
+
+
+def make_unemployment_fixture(path, rows, seed=0, start="1990-01-01"):
+    """Write a synthetic CSV in the notebook's unemployment.csv layout."""
+    import datetime
+
+    rng = random.Random(seed)
+    day = datetime.date.fromisoformat(start)
+    with open(path, "w", newline="") as fh:
+        fh.write("Region, Date, Frequency, Estimated Unemployment Rate (%), "
+                 "Estimated Employed, Estimated Labour Participation Rate "
+                 "(%),Region.1,longitude,latitude\n")
+        written = 0
+        while written < rows:
+            for region, area in REGIONS.items():
+                if written >= rows:
+                    break
+                fh.write(f"{region}, {day:%d-%m-%Y}, M, "
+                         f"{rng.uniform(1, 30):.2f}, "
+                         f"{rng.randint(100000, 60000000)}, "
+                         f"{rng.uniform(30, 60):.2f},{area},"
+                         f"{rng.uniform(10, 30):.4f},{rng.uniform(70, 90):.4f}\n")
+                written += 1
+            day += datetime.timedelta(days=1)
+
+
+def _notebook_analysis(path):
+    """What the notebook recomputes on every run."""
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    df.columns = df.columns.str.strip()
+    df = df.rename(columns={
+        "Estimated Unemployment Rate (%)": "Unemployment Rate",
+        "Estimated Employed": "Employed",
+        "Estimated Labour Participation Rate (%)": "Labour Participation Rate",
+        "Region.1": "Area",
+    }).drop(columns=["longitude", "latitude"], errors="ignore").dropna()
+    df["Date"] = pd.to_datetime(df["Date"], dayfirst=True)
+    df.groupby("Region")["Unemployment Rate"].mean()
+    df.groupby("Area")["Unemployment Rate"].mean()
+    df[["Unemployment Rate", "Employed", "Labour Participation Rate"]].corr()
+    return df
+
+
+def unemployment(args):
+    """
+    Compare the notebook's read-everything analysis with the cached
+    pipeline: first ingest, an append-only re-ingest, and serving the
+    precomputed views.
+    """
+    from unemployment import UnemploymentStore, build_results
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "unemployment.csv")
+        make_unemployment_fixture(path, args.rows)
+
+        t = time.perf_counter()
+        df = _notebook_analysis(path)
+        print(f"{'notebook analysis':<22} {time.perf_counter() - t:8.3f}s "
+              f"{df.memory_usage(deep=True).sum() / 1e6:8.1f} MB in memory")
+
+        store = UnemploymentStore(os.path.join(workdir, "cache"))
+        stats = store.ingest(path, chunksize=args.chunk_size)
+        frame = store.load_frame()
+        print(f"{'first ingest':<22} {stats['seconds']:8.3f}s "
+              f"{frame.memory_usage(deep=True).sum() / 1e6:8.1f} MB columnar")
+
+        make_unemployment_fixture(path + ".more", args.rows // 100, seed=1,
+                                  start="2100-01-01")
+        with open(path, "a") as out, open(path + ".more") as more:
+            next(more)  # header
+            out.writelines(more)
+        stats = store.ingest(path, chunksize=args.chunk_size)
+        print(f"{'append re-ingest':<22} {stats['seconds']:8.3f}s "
+              f"({stats['added']} new, {stats['skipped']} skipped)")
+
+        t = time.perf_counter()
+        results = build_results(store.load_state())
+        print(f"{'cold views':<22} {(time.perf_counter() - t) * 1000:8.2f}ms "
+              f"({len(results['regions'])} regions, "
+              f"{len(results['monthly'])} months)")
+    return 0
+
+
+# ---------------- Seat allocation ----------------
+
+def make_applicants(semester_ids, n, preferences, seed=0, prefix="A"):
+    """Ranked applicants whose choices favour a few popular semesters."""
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) for i in range(len(semester_ids))]
+    applicants = []
+    for i in range(n):
+        choices = list(dict.fromkeys(
+            rng.choices(semester_ids, weights, k=preferences * 2)
+        ))[:preferences]
+        applicants.append({"applicant": f"{prefix}{i:07d}",
+                           "rank": rng.randint(1, n),
+                           "preferences": choices})
+    return applicants
+
+
+def allocation(args):
+    """
+    Allocate a large ranked list through the admin API: a dry run, the
+    committed round, then an incremental round after seats are added.
+    Checks that seats given out match the seats taken off each semester.
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        app, auth = make_app(workdir)
+        client = app.test_client()
+
+        import catalog_io
+        from models import db, Course, Semester, Allocation
+        from sqlalchemy import func, select
+
+        rng = random.Random(0)
+        records = ((i, {"stream": f"Bench stream {i // 200}",
+                        "course": f"Bench course {i // 4}",
+                        "semester": i % 4 + 1,
+                        "available_seats": rng.randint(10, 60)})
+                   for i in range(args.semesters))
+        with app.app_context():
+            catalog_io.CatalogImporter().run(records)
+            before = dict(db.session.execute(
+                select(Semester.id, Semester.available_seats)).all())
+        ids = sorted(before)
+        applicants = make_applicants(ids, args.applicants, args.preferences)
+        print(f"{len(ids)} semesters, {sum(before.values())} seats, "
+              f"{len(applicants)} applicants x {args.preferences} preferences")
+
+        def post(label, body):
+            t = time.perf_counter()
+            res = client.post("/api/allocation/rounds", headers=auth,
+                              json=body)
+            wall = time.perf_counter() - t
+            data = res.get_json()
+            if res.status_code != 200:
+                print(f"{label}: HTTP {res.status_code} {data}")
+                return None
+            print(f"{label:<18} {wall:7.2f}s request, "
+                  f"{data['seconds']:6.2f}s engine: {data['allocated']} "
+                  f"allocated, {data['unallocated']} unallocated, "
+                  f"{data['held']} held")
+            return data
+
+        post("dry run", {"applicants": applicants, "dry_run": True})
+        post("round 1", {"applicants": applicants})
+
+        # free up seats in the most popular stream, then run again with
+        # everyone plus late applicants: only the unplaced are considered
+        with app.app_context():
+            stream_id = db.session.scalar(
+                select(Course.stream_id).join(Semester)
+                .where(Semester.id == ids[0]))
+            boosted = set(db.session.scalars(
+                select(Semester.id).join(Course)
+                .where(Course.stream_id == stream_id)))
+        client.post("/api/update_seats/bulk", headers=auth, json={
+            "stream_id": stream_id, "delta": args.added_seats
+        })
+        more = make_applicants(ids, args.applicants // 10, args.preferences,
+                               seed=1, prefix="B")
+        post("round 2", {"applicants": applicants + more})
+
+        with app.app_context():
+            after = dict(db.session.execute(
+                select(Semester.id, Semester.available_seats)).all())
+            given = dict(db.session.execute(
+                select(Allocation.semester_id, func.count())
+                .group_by(Allocation.semester_id)).all())
+        ok = all(
+            after[sid] >= 0 and after[sid] + given.get(sid, 0) ==
+            before[sid] + (args.added_seats if sid in boosted else 0)
+            for sid in ids
+        )
+        print("consistent" if ok else "INCONSISTENT seat counts")
+    return 0 if ok else 1
+
+
+# ---------------- Semester search ----------------
+
+SEARCH_MIX = [
+    "stream=MTech&min_seats=20",
+    "course=mtech&min_seats=20&sort=-seats",
+    "stream=Bench%203&sort=course",
+    "min_seats=75&max_number=2&sort=number",
+    "course=arts%20c12",
+    "sort=-seats&limit=200",
+]
+
+
+def search(args):
+    """
+    Latency of /api/semesters/search served from the in-memory index
+    against the same queries run on the database, on a large catalog.
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        app, auth = make_app(workdir)
+        client = app.test_client()
+
+        import catalog_io
+        import semester_search
+        from seat_events import record_resync
+        from app import catalog, semester_index
+        from models import db
+
+        rng = random.Random(0)
+        kinds = ["MTech", "MBA", "BTech", "Arts"]
+        records = ((i, {"stream": f"Bench {i % 7}",
+                        "course": f"{rng.choice(kinds)} c{i // 8}",
+                        "semester": i % 8 + 1,
+                        "available_seats": rng.randint(0, 80)})
+                   for i in range(args.semesters))
+        with app.app_context():
+            catalog_io.CatalogImporter(chunk_size=20000).run(records)
+            record_resync()
+            db.session.commit()
+            catalog.bump()
+
+        t = time.perf_counter()
+        client.get("/api/semesters/search")
+        print(f"{args.semesters} semesters; index built in "
+              f"{time.perf_counter() - t:.2f}s")
+
+        for qs in SEARCH_MIX:
+            params = dict(urllib.parse.parse_qsl(qs))
+            query = semester_search.SearchQuery.from_args(params)
+            timings = {"index": [], "database": []}
+            for _ in range(args.repeat):
+                t = time.perf_counter()
+                client.get("/api/semesters/search?" + qs)
+                timings["index"].append(time.perf_counter() - t)
+            with app.app_context():
+                for _ in range(max(1, args.repeat // 10)):
+                    t = time.perf_counter()
+                    semester_search.search_db(query)
+                    timings["database"].append(time.perf_counter() - t)
+            print(f"{qs:<40} index p50 "
+                  f"{percentile(timings['index'], 50) * 1000:6.2f}ms  "
+                  f"database p50 "
+                  f"{percentile(timings['database'], 50) * 1000:8.2f}ms")
+
+        latencies = []
+        for _ in range(args.repeat // 10):
+            client.post("/api/update_seats", headers=auth, json={
+                "semester_id": rng.randint(1, args.semesters),
+                "count": rng.randint(0, 80),
+            })
+            t = time.perf_counter()
+            client.get("/api/semesters/search?sort=seats")
+            latencies.append(time.perf_counter() - t)
+        print(summarize("after change", latencies))
+        print(f"index rebuilds {semester_index.rebuilds}, "
+              f"incremental updates {semester_index.patches}")
+    return 0
+
+
+# ---------------- Inventory report ----------------
+
+def report(args):
+    """
+    Time to first byte, total time and peak Python memory of the streamed
+    inventory report, against building the same report as one list.
+    """
+    import tracemalloc
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app, auth = make_app(workdir)
+        client = app.test_client()
+
+        import catalog_io
+        from models import db
+
+        rng = random.Random(0)
+        records = ((i, {"stream": f"Bench {i % 7}",
+                        "course": f"Course {i // 8}",
+                        "semester": i % 8 + 1,
+                        "available_seats": rng.randint(0, 80)})
+                   for i in range(args.semesters))
+        with app.app_context():
+            catalog_io.CatalogImporter(chunk_size=20000).run(records)
+            db.session.commit()
+
+        def streamed(fmt):
+            t = time.perf_counter()
+            res = client.get(f"/api/reports/inventory?format={fmt}",
+                             headers=auth, buffered=False)
+            chunks = iter(res.response)
+            size = len(next(chunks))
+            first = time.perf_counter() - t
+            size += sum(len(chunk) for chunk in chunks)
+            res.close()
+            return first, size
+
+        def materialized():
+            with app.app_context():
+                t = time.perf_counter()
+                body = json.dumps(list(catalog_io.iter_inventory()))
+                return time.perf_counter() - t, len(body)
+
+        # timed once plainly, then again under tracemalloc for the peak
+        for label, run in (("streamed csv", lambda: streamed("csv")),
+                           ("streamed ndjson", lambda: streamed("ndjson")),
+                           ("materialized json", materialized)):
+            t = time.perf_counter()
+            first, size = run()
+            total = time.perf_counter() - t
+            tracemalloc.start()
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{label:<18} first byte {first * 1000:8.1f}ms  "
+                  f"total {total:6.2f}s  {size / 1e6:6.1f} MB  "
+                  f"peak {peak / 1e6:6.1f} MB")
+    return 0
+
+
+# ---------------- Main ----------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("seat-stress", help="concurrent reserve/release check")
+    p.add_argument("--threads", type=int, default=16)
+    p.add_argument("--ops", type=int, default=200)
+    p.add_argument("--seats", type=int, default=50)
+    p.set_defaults(func=seat_stress)
+
+    p = sub.add_parser("login-storm", help="login burst vs API latency")
+    p.add_argument("--logins", type=int, default=32)
+    p.add_argument("--rounds", type=int, default=3)
+    p.add_argument("--readers", type=int, default=8)
+    p.add_argument("--hash-workers", type=int, default=2)
+    p.add_argument("--hash-queue", type=int, default=8)
+    p.set_defaults(func=login_storm)
+
+    p = sub.add_parser("mixed-rw", help="read/write throughput per SQLite profile")
+    p.add_argument("--profile", choices=["default", "production"],
+                   default="production")
+    p.add_argument("--compare", action="store_true",
+                   help="run both profiles back to back")
+    p.add_argument("--seconds", type=float, default=5)
+    p.add_argument("--readers", type=int, default=8)
+    p.add_argument("--writers", type=int, default=4)
+    p.set_defaults(func=mixed_rw)
+
+    p = sub.add_parser("replay", help="replay captured or synthetic traffic")
+    source = p.add_mutually_exclusive_group()
+    source.add_argument("--log", help="TRAFFIC_CAPTURE JSONL file")
+    source.add_argument("--synthetic", type=int, default=2000,
+                        help="number of admission-week requests")
+    p.add_argument("--requests", type=int,
+                   help="replay exactly this many (cycles the source)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--target", choices=["client", "gunicorn"],
+                   default="client")
+    p.add_argument("--url", help="drive an already running server instead")
+    p.add_argument("--workers", type=int, default=2,
+                   help="gunicorn workers for --target gunicorn")
+    p.add_argument("--threads", type=int, default=8)
+    p.add_argument("--baseline", help="compare against a saved report")
+    p.add_argument("--save-baseline", help="write this run's report")
+    p.add_argument("--threshold", type=float, default=0.2,
+                   help="allowed p95/throughput regression (fraction)")
+    p.set_defaults(func=replay)
+
+    p = sub.add_parser("car-price", help="per-row vs batched inference")
+    p.add_argument("--rows", type=int, default=2000)
+    p.add_argument("--threads", type=int, default=16)
+    p.add_argument("--batch", type=int, default=64)
+    p.add_argument("--wait-ms", type=float, default=0)
+    p.set_defaults(func=car_price)
+
+    p = sub.add_parser("car-price-check",
+                       help="saved car-price artifact vs scikit-learn")
+    p.add_argument("--csv", default=CAR_FIXTURE)
+    p.add_argument("--tolerance", type=float, default=1e-6)
+    p.set_defaults(func=car_price_check)
+
+    p = sub.add_parser("unemployment", help="notebook vs cached analytics")
+    p.add_argument("--rows", type=int, default=200000)
+    p.add_argument("--chunk-size", type=int, default=50000)
+    p.set_defaults(func=unemployment)
+
+    p = sub.add_parser("allocation", help="merit-order seat allocation rounds")
+    p.add_argument("--applicants", type=int, default=100000)
+    p.add_argument("--preferences", type=int, default=10)
+    p.add_argument("--semesters", type=int, default=2000)
+    p.add_argument("--added-seats", type=int, default=25,
+                   help="seats added per semester before round 2")
+    p.set_defaults(func=allocation)
+
+    p = sub.add_parser("search", help="indexed vs database semester search")
+    p.add_argument("--semesters", type=int, default=100000)
+    p.add_argument("--repeat", type=int, default=200)
+    p.set_defaults(func=search)
+
+    p = sub.add_parser("report", help="streamed inventory report memory/latency")
+    p.add_argument("--semesters", type=int, default=100000)
+    p.set_defaults(func=report)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
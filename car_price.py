@@ -0,0 +1,270 @@
+# car_price.py
+
+import csv
+import json
+import os
+from concurrent.futures import Future
+
+try:
+    import numpy as np
+except ImportError:  # serving is disabled; see CarPriceService
+    np = None
+
+from utils import BatchWorker, write_atomic
+
+# Feature pipeline from car_price_prediction.ipynb: Year becomes Car_Age
+# against a fixed reference year, then every text column is one-hot
+# encoded with its first (alphabetical) level dropped.
+TARGET = "Selling_Price"
+REFERENCE_YEAR = 2024
+NUMERIC = ["Present_Price", "Kms_Driven", "Owner", "Car_Age"]
+CATEGORICAL = ["Car_Name", "Fuel_Type", "Seller_Type", "Transmission"]
+
+
+class CarPriceModel:
+    """
+    The notebook's LinearRegression reduced to what inference needs:
+    feature levels, coefficients and intercept. Saved as JSON, so loading
+    it needs neither pickle nor scikit-learn, and prediction is a single
+    matrix product over a whole batch.
+    """
+
+    def __init__(self, levels, coef, intercept, metrics=None):
+        self.levels = levels          # column -> levels kept after drop_first
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.metrics = metrics or {}
+        self._index = {}
+        offset = len(NUMERIC)
+        for column in CATEGORICAL:
+            self._index[column] = {
+                level: offset + i for i, level in enumerate(levels[column])
+            }
+            offset += len(levels[column])
+        self.width = offset
+
+    # ---------------- Persistence ----------------
+
+    def to_dict(self):
+        return {"reference_year": REFERENCE_YEAR, "levels": self.levels,
+                "coef": self.coef.tolist(), "intercept": self.intercept,
+                "metrics": self.metrics}
+
+    def save(self, path):
+        data = json.dumps(self.to_dict(), indent=2).encode("utf-8")
+        write_atomic(path, lambda fh: fh.write(data))
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as fh:
+            data = json.load(fh)
+        return cls(data["levels"], data["coef"], data["intercept"],
+                   data.get("metrics"))
+
+    # ---------------- Inference ----------------
+
+    def featurize(self, records):
+        """
+        Build the design matrix for a list of input dicts. Unknown or
+        dropped levels encode as all zeros, as get_dummies would.
+        """
+        numeric, rows, cols = [], [], []
+        for row, record in enumerate(records):
+            values = parse_features(record)
+            numeric.append(values[:len(NUMERIC)])
+            for column, level in zip(CATEGORICAL, values[len(NUMERIC):]):
+                col = self._index[column].get(level)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+        X = np.zeros((len(records), self.width))
+        X[:, :len(NUMERIC)] = numeric
+        X[rows, cols] = 1.0
+        return X
+
+    def predict(self, records):
+        """Predicted selling prices, one per record, in order."""
+        if not records:
+            return []
+        return (self.featurize(records) @ self.coef + self.intercept).tolist()
+
+
+def parse_features(record):
+    """
+    Validate one input and return its numeric then categorical values.
+    Accepts Year or Car_Age. Raises ValueError on bad input.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("each input must be an object")
+    try:
+        if "Car_Age" in record:
+            age = float(record["Car_Age"])
+        else:
+            age = float(REFERENCE_YEAR - int(record["Year"]))
+        numeric = [float(record["Present_Price"]),
+                   float(record["Kms_Driven"]),
+                   float(record.get("Owner", 0)), age]
+    except KeyError as err:
+        raise ValueError(f"missing field {err.args[0]}") from None
+    except (TypeError, ValueError):
+        raise ValueError("numeric fields must be numbers") from None
+    categorical = [str(record.get(column, "")).strip()
+                   for column in CATEGORICAL]
+    return numeric + categorical
+
+
+# ---------------- Training ----------------
+
+def _fit(csv_path, test_size, random_state):
+    """The notebook's encoding and LinearRegression fit on a local CSV."""
+    import pandas as pd
+    from sklearn.linear_model import LinearRegression
+    from sklearn.model_selection import train_test_split
+
+    df = pd.read_csv(csv_path)
+    df["Car_Age"] = REFERENCE_YEAR - df["Year"]
+    df = df.drop("Year", axis=1)
+    for column in CATEGORICAL:
+        df[column] = df[column].astype(str).str.strip()
+    dummies = pd.get_dummies(df[CATEGORICAL], drop_first=True, dtype=float)
+    X = pd.concat([df[NUMERIC].astype(float), dummies], axis=1)
+    y = df[TARGET]
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=random_state
+    )
+    regression = LinearRegression().fit(X_train, y_train)
+    return X, dummies.columns, regression, X_test, y_test
+
+
+def train(csv_path, test_size=0.2, random_state=42):
+    """
+    Fit the notebook's model on a local CSV and return it with its test
+    R² and MAE. Needs pandas and scikit-learn; serving does not.
+    """
+    from sklearn.metrics import mean_absolute_error, r2_score
+
+    X, columns, regression, X_test, y_test = _fit(csv_path, test_size,
+                                                  random_state)
+    y_pred = regression.predict(X_test)
+
+    levels = {column: [name[len(column) + 1:] for name in columns
+                       if name.startswith(column + "_")]
+              for column in CATEGORICAL}
+    metrics = {"r2": float(r2_score(y_test, y_pred)),
+               "mae": float(mean_absolute_error(y_test, y_pred)),
+               "rows": int(len(X))}
+    return CarPriceModel(levels, regression.coef_, regression.intercept_,
+                         metrics)
+
+
+def verify(path, csv_path, test_size=0.2, random_state=42, tolerance=1e-6):
+    """
+    Check a saved artifact against scikit-learn: refit on the same split
+    and compare predictions for every CSV row, sent through the serving
+    path as raw records. Returns the largest absolute difference; raises
+    ValueError above ``tolerance``.
+    """
+    model = CarPriceModel.load(path)
+    X, _, regression, _, _ = _fit(csv_path, test_size, random_state)
+    with open(csv_path, newline="") as fh:
+        records = list(csv.DictReader(fh))
+    expected = regression.predict(X)
+    drift = float(np.max(np.abs(np.asarray(model.predict(records))
+                                - expected), initial=0.0))
+    if drift > tolerance:
+        raise ValueError(f"artifact predictions differ from "
+                         f"LinearRegression by up to {drift:.3g}")
+    return drift
+
+
+# ---------------- Serving ----------------
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row predictions. Callers get a Future; a
+    worker thread takes whatever is queued, waiting at most ``max_wait``
+    seconds for company, and predicts up to ``max_batch`` rows at once.
+    With ``max_wait`` 0 it never delays a row: batches form only from
+    requests that queued up while the previous batch was running.
+    """
+
+    def __init__(self, predict, max_batch=64, max_wait=0.0):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.rows = 0
+        self._worker = BatchWorker(self._predict, "car-price-batcher",
+                                   max_batch=max_batch, max_wait=max_wait)
+
+    def submit(self, record):
+        future = Future()
+        self._worker.put((record, future))
+        return future
+
+    def _predict(self, batch):
+        self.batches += 1
+        self.rows += len(batch)
+        try:
+            prices = self.predict([record for record, _ in batch])
+        except ValueError:
+            # one bad row must not fail its neighbours: retry row by row
+            for record, future in batch:
+                try:
+                    future.set_result(self.predict([record])[0])
+                except ValueError as err:
+                    future.set_exception(err)
+            return
+        except Exception as err:
+            for _, future in batch:
+                future.set_exception(err)
+            return
+        for (_, future), price in zip(batch, prices):
+            future.set_result(price)
+
+
+class CarPriceService:
+    """
+    Loads the car-price artifact once per process (before the fork when
+    gunicorn preloads the app) and serves it directly for batches and
+    through a MicroBatcher for single rows.
+    """
+
+    def __init__(self, app=None):
+        self.model = None
+        self.batcher = None
+        self.error = "Model not loaded"
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["car_price"] = self
+        self.max_items = app.config["CAR_PRICE_MAX_ITEMS"]
+        self.timeout = app.config["CAR_PRICE_TIMEOUT"]
+        self.load(app.config["CAR_PRICE_MODEL"], app.logger)
+        self.batcher = MicroBatcher(
+            self.predict,
+            max_batch=app.config["CAR_PRICE_BATCH_MAX"],
+            max_wait=app.config["CAR_PRICE_BATCH_WAIT_MS"] / 1000,
+        )
+
+    def load(self, path, logger=None):
+        if np is None:
+            self.error = "numpy is not installed"
+        elif not os.path.exists(path):
+            self.error = "Model not trained; run `flask train-car-model`"
+        else:
+            self.model = CarPriceModel.load(path)
+            self.error = None
+        if self.error and logger:
+            logger.warning(f"⚠️ car price model unavailable: {self.error}")
+
+    def predict(self, records):
+        return self.model.predict(records)
+
+    def predict_one(self, record):
+        if self.batcher.max_batch <= 1:
+            return self.predict([record])[0]
+        parse_features(record)  # reject bad input before it joins a batch
+        return self.batcher.submit(record).result(timeout=self.timeout)
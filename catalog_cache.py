@@ -0,0 +1,130 @@
+# catalog_cache.py
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+from utils import write_atomic
+
+
+# Payloads smaller than this are not worth a gzip header
+GZIP_MIN_SIZE = 512
+
+
+class CacheEntry:
+    """A serialized JSON payload plus its strong ETag."""
+
+    __slots__ = ("body", "etag", "_gzipped")
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+        self._gzipped = None
+
+    @property
+    def compressible(self):
+        return len(self.body) >= GZIP_MIN_SIZE
+
+    @property
+    def gzipped(self):
+        """The gzip-encoded body, compressed once and then reused."""
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzipped
+
+
+class CatalogCache:
+    """
+    Read-through cache for catalog API payloads, keyed by a catalog version.
+
+    The version lives in a small stamp file so every gunicorn worker on the
+    host sees the same value without a database round trip: writers call
+    ``bump()`` after committing, readers ``stat()`` the file and drop their
+    cached payloads as soon as it changes.
+    """
+
+    def __init__(self, app=None):
+        self._path = None
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._fragments = {}
+        self._version = None
+        self._stamp = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._path = app.config["CATALOG_VERSION_FILE"]
+        app.extensions["catalog_cache"] = self
+
+    # ---------------- Version ----------------
+
+    def version(self):
+        """Return the current catalog version, reloading it if the file changed."""
+        try:
+            st = os.stat(self._path)
+        except FileNotFoundError:
+            return self.bump()
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    with open(self._path) as fh:
+                        version = int(fh.read().strip() or 0)
+                    if version != self._version:
+                        self._entries = {}
+                        self._version = version
+                    self._stamp = stamp
+        return self._version
+
+    def bump(self):
+        """Publish a new catalog version to every worker; call after commit."""
+        with self._lock:
+            version = max(time.time_ns(), (self._version or 0) + 1)
+            write_atomic(self._path, lambda fh: fh.write(str(version).encode()))
+            self._entries = {}
+            self._version = version
+            self._stamp = None
+        return version
+
+    # ---------------- Entries ----------------
+
+    def get(self, key, loader):
+        """
+        Return the cached entry for ``key``, calling ``loader()`` on a miss.
+        ``loader`` must return a JSON-serializable object.
+        """
+        return self._get(key, lambda: CacheEntry(
+            json.dumps(loader(), separators=(",", ":")).encode("utf-8")
+        ))
+
+    def get_fragment(self, key, source, render):
+        """
+        Return a rendered HTML fragment for ``key`` built from the cached
+        ``source`` entry, calling ``render(source)`` when that entry's ETag
+        changed. Fragments survive bumps that leave their source as it was,
+        so seat changes don't re-render a fragment of stream names.
+        """
+        cached = self._fragments.get(key)
+        if cached is None or cached[0] != source.etag:
+            cached = (source.etag, render(source))
+            self._fragments[key] = cached
+        return cached[1]
+
+    def _get(self, key, build):
+        version = self.version()
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = build()
+            with self._lock:
+                if self._version == version:
+                    self._entries[key] = entry
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._fragments = {}
@@ -0,0 +1,278 @@
+# catalog_io.py
+
+import csv
+import io
+import json
+import time
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Stream, Course, Semester
+from engines import read_snapshot
+from seat_history import record_snapshot
+from utils import chunked
+
+FIELDS = ["stream", "course", "semester", "available_seats"]
+REPORT_FIELDS = ["row_type", "stream", "course", "semester", "semesters",
+                 "available_seats"]
+# Streamed responses are flushed in pieces of about this many characters
+STREAM_CHUNK = 32 * 1024
+
+
+class ImportStats:
+    def __init__(self):
+        self.rows = 0
+        self.skipped = 0
+        self.streams = 0
+        self.courses = 0
+        self.started = time.perf_counter()
+
+    @property
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.rows / elapsed if elapsed else 0.0
+
+
+# ---------------- Readers / writers ----------------
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def iter_records(fh, fmt):
+    """Yield ``(line_no, record)`` one at a time; never reads ahead."""
+    if fmt == "csv":
+        reader = csv.DictReader(fh)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_no, line in enumerate(fh, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError:
+            yield line_no, None  # rejected by parse_record
+
+
+def parse_record(record):
+    """Normalize one input record or raise ValueError."""
+    stream = str(record["stream"]).strip()
+    course = str(record["course"]).strip()
+    number = int(record["semester"])
+    seats = int(record["available_seats"])
+    if not stream or not course or number < 1 or seats < 0:
+        raise ValueError("empty name or out-of-range number")
+    return stream, course, number, seats
+
+
+# ---------------- Import ----------------
+
+class CatalogImporter:
+    """
+    Upserts catalog rows chunk by chunk. Stream and course names resolve
+    through in-memory maps loaded once; only names not seen before cost a
+    round trip. Every chunk is committed on its own, and because semesters
+    are upserted on (course_id, number), re-running a partly failed import
+    is safe.
+    """
+
+    def __init__(self, chunk_size=5000):
+        self.chunk_size = chunk_size
+        self.stats = ImportStats()
+        self.streams = dict(
+            db.session.execute(select(Stream.name, Stream.id)).all()
+        )
+        self.courses = {
+            (stream_id, name): course_id
+            for course_id, stream_id, name in db.session.execute(
+                select(Course.id, Course.stream_id, Course.name)
+            )
+        }
+
+    def _upsert_stmt(self):
+        dialect = db.engine.dialect.name
+        if dialect == "sqlite":
+            stmt = sqlite.insert(Semester)
+        elif dialect == "postgresql":
+            stmt = postgresql.insert(Semester)
+        else:
+            raise RuntimeError(f"import-catalog does not support {dialect}")
+        return stmt.on_conflict_do_update(
+            index_elements=["course_id", "number"],
+            set_={
+                "available_seats": stmt.excluded.available_seats,
+                "version": Semester.version + 1,
+            },
+        )
+
+    def _resolve_streams(self, names):
+        missing = sorted(set(names) - self.streams.keys())
+        if not missing:
+            return
+        db.session.execute(insert(Stream), [{"name": n} for n in missing])
+        self.streams.update(db.session.execute(
+            select(Stream.name, Stream.id).where(Stream.name.in_(missing))
+        ).all())
+        self.stats.streams += len(missing)
+
+    def _resolve_courses(self, keys):
+        missing = sorted(set(keys) - self.courses.keys())
+        if not missing:
+            return
+        db.session.execute(insert(Course), [
+            {"stream_id": stream_id, "name": name}
+            for stream_id, name in missing
+        ])
+        for stream_id in {stream_id for stream_id, _ in missing}:
+            names = [name for sid, name in missing if sid == stream_id]
+            for course_id, name in db.session.execute(
+                select(Course.id, Course.name)
+                .where(Course.stream_id == stream_id, Course.name.in_(names))
+            ):
+                self.courses[(stream_id, name)] = course_id
+        self.stats.courses += len(missing)
+
+    def load_chunk(self, rows):
+        self._resolve_streams(stream for stream, _, _, _ in rows)
+        self._resolve_courses(
+            (self.streams[stream], course) for stream, course, _, _ in rows
+        )
+        # the last row wins when a chunk names the same semester twice
+        params = {}
+        for stream, course, number, seats in rows:
+            course_id = self.courses[(self.streams[stream], course)]
+            params[(course_id, number)] = {
+                "course_id": course_id, "number": number,
+                "available_seats": seats, "version": 1,
+            }
+        touched = db.session.execute(
+            self._upsert_stmt().returning(Semester.id), list(params.values())
+        ).scalars().all()
+        record_snapshot(touched)
+        db.session.commit()
+        self.stats.rows += len(rows)
+
+    def run(self, records, on_error=None, on_progress=None):
+        def parsed():
+            for line_no, record in records:
+                try:
+                    yield parse_record(record)
+                except (KeyError, TypeError, ValueError) as err:
+                    self.stats.skipped += 1
+                    if on_error:
+                        on_error(line_no, err)
+
+        for chunk in chunked(parsed(), self.chunk_size):
+            self.load_chunk(chunk)
+            if on_progress:
+                on_progress(self.stats)
+        return self.stats
+
+
+# ---------------- Export ----------------
+
+def iter_catalog(batch_size=2000):
+    """
+    Stream every semester with its stream and course names, in catalog
+    order, from a server-side cursor; memory stays flat at ``batch_size``.
+    One query per stream walks the (stream_id, name) and (course_id,
+    number) indexes in order, so nothing sorts the whole catalog before
+    the first row comes back. All of them run in one read transaction,
+    so the export is a consistent snapshot however long it takes.
+    """
+    with read_snapshot() as conn:
+        streams = conn.execute(
+            select(Stream.id, Stream.name).order_by(Stream.name)
+        ).all()
+        for stream_id, stream in streams:
+            rows = conn.execute(
+                select(Course.name, Semester.number,
+                       Semester.available_seats)
+                .join(Semester, Semester.course_id == Course.id)
+                .where(Course.stream_id == stream_id)
+                .order_by(Course.name, Semester.number)
+                .execution_options(yield_per=batch_size)
+            )
+            for row in rows:
+                yield dict(zip(FIELDS, (stream, *row)))
+
+
+def iter_inventory(batch_size=2000):
+    """
+    ``iter_catalog`` rows with a subtotal after each course and stream
+    and a grand total at the end, summed in the same ordered pass: only
+    the running totals are kept.
+    """
+    totals = {kind: [0, 0] for kind in ("course", "stream", "total")}
+
+    def total(kind, stream=None, course=None):
+        semesters, seats = totals[kind]
+        totals[kind] = [0, 0]
+        return {"row_type": f"{kind}_total" if kind != "total" else kind,
+                "stream": stream, "course": course, "semester": None,
+                "semesters": semesters, "available_seats": seats}
+
+    stream = course = None
+    for record in iter_catalog(batch_size):
+        if course is not None and (record["stream"], record["course"]) != \
+                (stream, course):
+            yield total("course", stream, course)
+            if record["stream"] != stream:
+                yield total("stream", stream)
+        stream, course = record["stream"], record["course"]
+        seats = record["available_seats"] or 0
+        for kind in totals:
+            totals[kind][0] += 1
+            totals[kind][1] += seats
+        yield {"row_type": "semester", "stream": stream, "course": course,
+               "semester": record["semester"], "semesters": None,
+               "available_seats": record["available_seats"]}
+    if course is not None:
+        yield total("course", stream, course)
+        yield total("stream", stream)
+    yield total("total")
+
+
+def write_records(fh, records, fmt, fields=FIELDS):
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(fh, fieldnames=fields)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            count += 1
+    else:
+        for record in records:
+            fh.write(json.dumps(record) + "\n")
+            count += 1
+    return count
+
+
+def iter_encoded(records, fmt, fields=FIELDS, chunk_size=STREAM_CHUNK):
+    """
+    Encode records as CSV or NDJSON text for a streamed response. The CSV
+    header goes out on its own so the first byte doesn't wait for data;
+    rows follow in pieces of about ``chunk_size`` characters.
+    """
+    buf = io.StringIO()
+    if fmt == "csv":
+        writer = csv.DictWriter(buf, fieldnames=fields)
+        writer.writeheader()
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        write = writer.writerow
+    else:
+        def write(record):
+            buf.write(json.dumps(record, separators=(",", ":")) + "\n")
+    for record in records:
+        write(record)
+        if buf.tell() >= chunk_size:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
@@ -2,8 +2,32 @@
 
 import os
 
+from sqlalchemy.engine import make_url
+
 basedir = os.path.abspath(os.path.dirname(__file__))
 
+
+def _in_memory(url):
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and (
+        parsed.database in (None, "", ":memory:")
+        or parsed.query.get("mode") == "memory")
+
+
+def _pool_options(url):
+    """
+    QueuePool sizing for an engine URL. In-memory SQLite gets a StaticPool,
+    which rejects these arguments, so it gets none.
+    """
+    if _in_memory(url):
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 10)),
+    }
+
+
 class Config:
     # Database URI: use managed DATABASE_URL or fallback to SQLite file
     SQLALCHEMY_DATABASE_URI = os.getenv(
@@ -12,6 +36,114 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    SQLALCHEMY_ENGINE_OPTIONS = _pool_options(SQLALCHEMY_DATABASE_URI)
+
+    # Read-only GET APIs use their own engine: a replica, or the same file.
+    # An in-memory database is private to its engine, so reads then fall
+    # back to the primary engine.
+    _read_url = os.getenv("DATABASE_READ_URL", SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_BINDS = {} if _in_memory(_read_url) else {
+        "read": {"url": _read_url, **_pool_options(_read_url)}
+    }
+
+    # SQLite engine profile: "production" applies SQLITE_PRAGMAS on every
+    # connect, "default" leaves SQLite's stock settings alone
+    SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "production")
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+        "cache_size": -int(os.getenv("SQLITE_CACHE_KB", 64 * 1024)),
+        "temp_store": "MEMORY",
+    }
+
+    # Catalog cache: version stamp shared by all workers on this host
+    CATALOG_VERSION_FILE = os.getenv(
+        "CATALOG_VERSION_FILE",
+        os.path.join(basedir, "catalog.version")
+    )
+
+    # Held while one process runs schema upgrade / seeding at startup
+    STARTUP_LOCK_FILE = os.getenv(
+        "STARTUP_LOCK_FILE",
+        os.path.join(basedir, "startup.lock")
+    )
+
+    # Upper bound on items accepted by /api/update_seats/bulk
+    BULK_SEATS_MAX_ITEMS = int(os.getenv("BULK_SEATS_MAX_ITEMS", 10000))
+
+    # Live seat events (Server-Sent Events)
+    SEAT_EVENTS_POLL_INTERVAL = float(os.getenv("SEAT_EVENTS_POLL_INTERVAL", 0.25))
+    SEAT_EVENTS_QUEUE_SIZE = int(os.getenv("SEAT_EVENTS_QUEUE_SIZE", 100))
+    SEAT_EVENTS_HEARTBEAT = float(os.getenv("SEAT_EVENTS_HEARTBEAT", 15))
+    SEAT_EVENTS_RETENTION = int(os.getenv("SEAT_EVENTS_RETENTION", 600))
+    # Each open stream holds a gunicorn thread, so cap them per worker well
+    # below GUNICORN_THREADS; past the cap the stream answers 503. A closed
+    # tab frees its slot at the next heartbeat.
+    SEAT_EVENTS_MAX_SUBSCRIBERS = int(os.getenv("SEAT_EVENTS_MAX_SUBSCRIBERS", 8))
+
+    # Seat history: changes are queued after commit and written in batches
+    # of SEAT_HISTORY_BATCH_SIZE or every SEAT_HISTORY_FLUSH_INTERVAL seconds
+    SEAT_HISTORY_ENABLED = os.getenv("SEAT_HISTORY_ENABLED", "true").lower() == "true"
+    SEAT_HISTORY_BATCH_SIZE = int(os.getenv("SEAT_HISTORY_BATCH_SIZE", 500))
+    SEAT_HISTORY_FLUSH_INTERVAL = float(os.getenv("SEAT_HISTORY_FLUSH_INTERVAL", 1.0))
+    SEAT_HISTORY_QUEUE_SIZE = int(os.getenv("SEAT_HISTORY_QUEUE_SIZE", 50000))
+    # Widest range one series request may cover, in days
+    SEAT_HISTORY_MAX_DAYS = {"hour": 31, "day": 731}
+
+    # /api/semesters/search: per-worker in-memory index (semester_search.py);
+    # disabled, or without numpy, searches run against the database
+    SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "true").lower() == "true"
+    SEARCH_DEFAULT_LIMIT = int(os.getenv("SEARCH_DEFAULT_LIMIT", 50))
+    SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", 500))
+
+    # Seat allocation (allocation.py): limits for one round via the API
+    # or `flask allocate-seats`
+    ALLOCATION_MAX_APPLICANTS = int(os.getenv("ALLOCATION_MAX_APPLICANTS", 200000))
+    ALLOCATION_MAX_PREFERENCES = int(os.getenv("ALLOCATION_MAX_PREFERENCES", 10))
+
+    # Password hashing: werkzeug method string (cost lives in it), pool
+    # threads per worker, and how many extra hashes may wait for a thread
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", 8))
+
+    # Request/SQL instrumentation served at /metrics; off means no hooks
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+    METRICS_SLOW_QUERY_MS = float(os.getenv("METRICS_SLOW_QUERY_MS", 100))
+    METRICS_QUERY_ALARM = int(os.getenv("METRICS_QUERY_ALARM", 10))
+
+    # Sampled request capture for benchmarks.py replay
+    TRAFFIC_CAPTURE = os.getenv("TRAFFIC_CAPTURE", "false").lower() == "true"
+    TRAFFIC_SAMPLE_RATE = float(os.getenv("TRAFFIC_SAMPLE_RATE", 0.1))
+    TRAFFIC_LOG = os.getenv("TRAFFIC_LOG", os.path.join(basedir, "traffic.jsonl"))
+    TRAFFIC_MAX_BODY = int(os.getenv("TRAFFIC_MAX_BODY", 64 * 1024))
+
+    # Fingerprinted static assets, built by `flask build-assets`
+    ASSETS_DIR = os.getenv("ASSETS_DIR", os.path.join(basedir, "assets"))
+    ASSETS_MAX_AGE = int(os.getenv("ASSETS_MAX_AGE", 365 * 24 * 3600))
+    ASSETS_IMAGE_WIDTHS = (640, 1280, 1920)
+    ASSETS_IMAGE_QUALITY = int(os.getenv("ASSETS_IMAGE_QUALITY", 80))
+
+    # Car price model (car_price.py): JSON artifact from `flask
+    # train-car-model`, loaded once per process. Single-row requests are
+    # coalesced into batches of up to CAR_PRICE_BATCH_MAX (1 predicts
+    # inline), waiting up to CAR_PRICE_BATCH_WAIT_MS for company
+    CAR_PRICE_MODEL = os.getenv(
+        "CAR_PRICE_MODEL", os.path.join(basedir, "car_price_model.json")
+    )
+    CAR_PRICE_BATCH_MAX = int(os.getenv("CAR_PRICE_BATCH_MAX", 1))
+    CAR_PRICE_BATCH_WAIT_MS = float(os.getenv("CAR_PRICE_BATCH_WAIT_MS", 0))
+    CAR_PRICE_MAX_ITEMS = int(os.getenv("CAR_PRICE_MAX_ITEMS", 1000))
+    CAR_PRICE_TIMEOUT = float(os.getenv("CAR_PRICE_TIMEOUT", 5))
+
+    # Unemployment analytics (unemployment.py): columnar cache and rollups
+    # written by `flask ingest-unemployment`
+    UNEMPLOYMENT_CACHE_DIR = os.getenv(
+        "UNEMPLOYMENT_CACHE_DIR", os.path.join(basedir, "analytics_cache")
+    )
+
     # Flask secret
     SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 
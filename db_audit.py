@@ -0,0 +1,200 @@
+# db_audit.py
+
+from sqlalchemy import case, delete, func, select, tuple_, update
+from sqlalchemy.exc import SQLAlchemyError
+from models import (
+    db, User, Stream, Course, Semester, SeatEvent, SeatHistory, SeatRollup,
+    Allocation, AllocationRound
+)
+
+
+class AuditQuery:
+    """A statement one of the routes issues, and whether a scan is expected."""
+
+    def __init__(self, name, build, full_scan_ok=False):
+        self.name = name
+        self.build = build
+        self.full_scan_ok = full_scan_ok
+
+
+# Mirrors the statements issued by the API routes and seats.py. Keep this
+# list in step with them; sample ids only need to be well-formed.
+AUDIT_QUERIES = [
+    AuditQuery("login: user by username+role", lambda: (
+        select(User).where(User.username == "admin", User.role == "admin")
+    )),
+    AuditQuery("register/forgot: user by username", lambda: (
+        select(User).where(User.username == "admin")
+    )),
+    AuditQuery("/api/streams", lambda: (
+        select(Stream).order_by(Stream.id)
+    ), full_scan_ok=True),
+    AuditQuery("/api/courses/<stream_id>", lambda: (
+        select(Course).where(Course.stream_id == 1).order_by(Course.id)
+    )),
+    AuditQuery("/api/semesters/<course_id>", lambda: (
+        select(Semester).where(Semester.course_id == 1)
+        .order_by(Semester.number, Semester.id)
+    )),
+    AuditQuery("/api/catalog (whole tree)", lambda: (
+        select(Stream.id, Course.id, Semester.id)
+        .outerjoin(Course, Course.stream_id == Stream.id)
+        .outerjoin(Semester, Semester.course_id == Course.id)
+        .order_by(Stream.id, Course.id, Semester.number, Semester.id)
+    ), full_scan_ok=True),
+    AuditQuery("/api/catalog?stream_id=", lambda: (
+        select(Stream.id, Course.id, Semester.id)
+        .outerjoin(Course, Course.stream_id == Stream.id)
+        .outerjoin(Semester, Semester.course_id == Course.id)
+        .where(Stream.id == 1)
+        .order_by(Stream.id, Course.id, Semester.number, Semester.id)
+    )),
+    AuditQuery("seat update / reserve / release", lambda: (
+        update(Semester)
+        .where(Semester.id == 1, Semester.available_seats - 1 >= 0)
+        .values(available_seats=Semester.available_seats - 1,
+                version=Semester.version + 1)
+    )),
+    AuditQuery("bulk: read planned rows", lambda: (
+        select(Semester.id, Semester.available_seats, Semester.version)
+        .where(Semester.id.in_([1, 2, 3]))
+    )),
+    AuditQuery("bulk: UPDATE ... CASE", lambda: (
+        update(Semester)
+        .where(Semester.id.in_([1, 2]),
+               tuple_(Semester.id, Semester.version).in_([(1, 1), (2, 1)]))
+        .values(available_seats=case({1: 5, 2: 6}, value=Semester.id),
+                version=Semester.version + 1)
+    )),
+    AuditQuery("bulk rule: course", lambda: (
+        update(Semester).where(Semester.course_id == 1)
+        .values(available_seats=10, version=Semester.version + 1)
+    )),
+    AuditQuery("bulk rule: stream", lambda: (
+        update(Semester)
+        .where(Semester.course_id.in_(
+            select(Course.id).where(Course.stream_id == 1)
+        ))
+        .values(available_seats=10, version=Semester.version + 1)
+    )),
+    AuditQuery("seat events: outbox insert source", lambda: (
+        select(Semester.id, Semester.course_id, Course.stream_id)
+        .join(Course, Course.id == Semester.course_id)
+        .where(Semester.id.in_([1, 2, 3]))
+    )),
+    AuditQuery("seat events: latest id", lambda: (
+        select(func.max(SeatEvent.id))
+    )),
+    AuditQuery("seat events: since id", lambda: (
+        select(SeatEvent).where(SeatEvent.id > 1)
+        .where((SeatEvent.course_id == 1) | SeatEvent.semester_id.is_(None))
+        .order_by(SeatEvent.id).limit(1000)
+    )),
+    AuditQuery("seat events: prune", lambda: (
+        delete(SeatEvent).where(SeatEvent.created_at < 0, SeatEvent.id < 1)
+    )),
+    AuditQuery("history: semester series", lambda: (
+        select(SeatRollup).where(SeatRollup.granularity == "hour",
+                                 SeatRollup.semester_id == 1,
+                                 SeatRollup.bucket_start >= 0,
+                                 SeatRollup.bucket_start < 1)
+        .order_by(SeatRollup.bucket_start)
+    )),
+    AuditQuery("history: course series", lambda: (
+        select(SeatRollup).where(SeatRollup.granularity == "hour",
+                                 SeatRollup.course_id == 1,
+                                 SeatRollup.bucket_start >= 0,
+                                 SeatRollup.bucket_start < 1)
+        .order_by(SeatRollup.bucket_start)
+    )),
+    AuditQuery("history: stream series", lambda: (
+        select(SeatRollup).where(SeatRollup.granularity == "hour",
+                                 SeatRollup.stream_id == 1,
+                                 SeatRollup.bucket_start >= 0,
+                                 SeatRollup.bucket_start < 1)
+        .order_by(SeatRollup.bucket_start)
+    )),
+    AuditQuery("history: last bucket before range", lambda: (
+        select(Semester.id, select(SeatRollup.last_seats)
+               .where(SeatRollup.granularity == "hour",
+                      SeatRollup.semester_id == Semester.id,
+                      SeatRollup.bucket_start < 1)
+               .order_by(SeatRollup.bucket_start.desc()).limit(1)
+               .scalar_subquery())
+        .where(Semester.course_id == 1)
+    )),
+    AuditQuery("history: semester changes", lambda: (
+        select(SeatHistory).where(SeatHistory.semester_id == 1,
+                                  SeatHistory.id < 100)
+        .order_by(SeatHistory.id.desc()).limit(100)
+    )),
+    AuditQuery("export/report: streams in name order", lambda: (
+        select(Stream.id, Stream.name).order_by(Stream.name)
+    )),
+    AuditQuery("export/report: one stream's semesters in order", lambda: (
+        select(Course.name, Semester.number, Semester.available_seats)
+        .join(Semester, Semester.course_id == Course.id)
+        .where(Course.stream_id == 1)
+        .order_by(Course.name, Semester.number)
+    )),
+    AuditQuery("search index: rebuild", lambda: (
+        select(Semester.id, Course.name, Stream.name)
+        .join(Course, Course.id == Semester.course_id)
+        .join(Stream, Stream.id == Course.stream_id)
+        .order_by(Semester.id)
+    ), full_scan_ok=True),
+    AuditQuery("search index: replay seat events", lambda: (
+        select(SeatEvent.semester_id, SeatEvent.available_seats)
+        .where(SeatEvent.id > 1, SeatEvent.id <= 100)
+        .order_by(SeatEvent.id)
+    )),
+    AuditQuery("allocation: applicants already placed", lambda: (
+        select(Allocation.applicant, Allocation.semester_id,
+               Allocation.preference)
+        .where(Allocation.applicant.in_(["a1", "a2"]))
+    )),
+    AuditQuery("allocation: recent rounds", lambda: (
+        select(AllocationRound).order_by(AllocationRound.id.desc()).limit(50)
+    ), full_scan_ok=True),
+    AuditQuery("allocation: round seats", lambda: (
+        select(Allocation).where(Allocation.round_id == 1, Allocation.id > 0)
+        .order_by(Allocation.id).limit(1000)
+    )),
+]
+
+
+def _explain(conn, sql):
+    """Return (plan lines, full-scan lines) for one compiled statement."""
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql).all()
+        lines = [row[-1] for row in rows]
+        # "SCAN 2 CONSTANT ROWS" is an IN (VALUES ...) list, not a table
+        scans = [l for l in lines
+                 if l.startswith("SCAN ") and " USING " not in l
+                 and "CONSTANT ROW" not in l]
+    else:
+        lines = [row[0] for row in conn.exec_driver_sql("EXPLAIN " + sql)]
+        scans = [l for l in lines if "Seq Scan" in l]
+    return lines, scans
+
+
+def run_audit(queries=AUDIT_QUERIES):
+    """
+    EXPLAIN every audited statement without executing it. Returns a list of
+    ``(query, plan_lines, unexpected_scans)``.
+    """
+    results = []
+    with db.engine.connect() as conn:
+        for query in queries:
+            stmt = query.build()
+            sql = str(stmt.compile(dialect=conn.dialect,
+                                   compile_kwargs={"literal_binds": True}))
+            try:
+                lines, scans = _explain(conn, sql)
+            except SQLAlchemyError as err:
+                # usually a column the database doesn't have yet
+                lines = scans = [f"error: {err.orig or err}"]
+                results.append((query, lines, scans))
+                continue
+            results.append((query, lines, [] if query.full_scan_ok else scans))
+    return results
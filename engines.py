@@ -0,0 +1,63 @@
+# engines.py
+
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from models import db
+
+
+def _is_file_sqlite(engine):
+    return (engine.dialect.name == "sqlite"
+            and engine.url.database not in (None, "", ":memory:"))
+
+
+def _pragma_listener(pragmas, read_only):
+    def on_connect(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        for name, value in pragmas.items():
+            cur.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cur.execute("PRAGMA query_only=ON")
+        cur.close()
+    return on_connect
+
+
+def configure_engines(app):
+    """
+    Apply the SQLite engine profile to every engine on connect. The
+    "production" profile turns on WAL so readers never wait for the writer,
+    relaxes fsyncs to synchronous=NORMAL and waits out lock contention
+    with busy_timeout instead of failing with "database is locked".
+    """
+    profile = app.config["SQLITE_PROFILE"]
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if not _is_file_sqlite(engine) or profile == "default":
+                continue
+            event.listen(engine, "connect", _pragma_listener(
+                app.config["SQLITE_PRAGMAS"], read_only=(key == "read")
+            ))
+
+
+def read_engine():
+    """Engine for read-only queries; falls back to the primary engine."""
+    return db.engines.get("read", db.engine)
+
+
+def read_all(stmt):
+    """Run a SELECT on the read engine and return all rows."""
+    with read_engine().connect() as conn:
+        return conn.execute(stmt).all()
+
+
+@contextmanager
+def read_snapshot():
+    """
+    A read-engine connection whose queries all see one point in time.
+    pysqlite runs each SELECT outside a transaction, so this opens one
+    explicitly; it is rolled back when the block exits.
+    """
+    with read_engine().connect() as conn:
+        if conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("BEGIN")
+        yield conn
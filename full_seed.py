@@ -22,6 +22,7 @@ def main():
     from app import app
     with app.app_context():
         full_refresh()
+        app.extensions["catalog_cache"].bump()
         print("✅ Full refresh complete.")
 
 if __name__ == "__main__":
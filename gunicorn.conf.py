@@ -0,0 +1,27 @@
+# gunicorn.conf.py
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Import the app (which runs startup) once in the master, then fork
+# workers that inherit the warmed catalog cache copy-on-write. Without
+# preload each worker imports it and runs startup itself, one at a time.
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# Threaded workers: the seat SSE stream parks one thread per open page,
+# so plain sync workers would be exhausted by a handful of faculty tabs.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.getenv(
+    "WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8)
+))
+threads = int(os.getenv("GUNICORN_THREADS", 16))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 20
+keepalive = 5
+
+# Recycle workers now and then; with preload a fresh worker is a cheap fork
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = 200
@@ -0,0 +1,180 @@
+# metrics.py
+
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from flask import request
+from sqlalchemy import event
+from models import db
+
+# Upper bounds (seconds) shared by every histogram
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+_request_stats = ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    __slots__ = ("started", "queries", "sql_seconds")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += 1
+        self.sum += value
+
+
+def _labels(**labels):
+    return ",".join(f'{k}="{v}"' for k, v in labels.items())
+
+
+class Metrics:
+    """
+    Per-worker request and SQL instrumentation, exposed at /metrics in
+    Prometheus text format. With METRICS_ENABLED off nothing is hooked in,
+    so requests pay nothing for it.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.latency = {}       # (endpoint, method, status) -> Histogram
+        self.sql_time = {}      # endpoint -> Histogram
+        self.query_counts = {}  # endpoint -> Histogram
+        self.slow_queries = 0
+        self.query_alarms = {}  # endpoint -> count
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["metrics"] = self
+        self.enabled = app.config["METRICS_ENABLED"]
+        if not self.enabled:
+            return
+        self.logger = app.logger
+        self.slow_query = app.config["METRICS_SLOW_QUERY_MS"] / 1000
+        self.query_alarm = app.config["METRICS_QUERY_ALARM"]
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, "before_cursor_execute",
+                             self._before_cursor)
+                event.listen(engine, "after_cursor_execute",
+                             self._after_cursor)
+
+    # ---------------- Hooks ----------------
+
+    def _before_request(self):
+        _request_stats.set(RequestStats())
+
+    def _after_request(self, response):
+        stats = _request_stats.get()
+        if stats is None:
+            return response
+        _request_stats.set(None)
+        elapsed = time.perf_counter() - stats.started
+        endpoint = request.endpoint or "unmatched"
+        key = (endpoint, request.method, response.status_code)
+
+        with self._lock:
+            self.latency.setdefault(key, Histogram(BUCKETS)).observe(elapsed)
+            self.sql_time.setdefault(
+                endpoint, Histogram(BUCKETS)).observe(stats.sql_seconds)
+            self.query_counts.setdefault(
+                endpoint, Histogram(QUERY_COUNT_BUCKETS)).observe(stats.queries)
+            if stats.queries > self.query_alarm:
+                self.query_alarms[endpoint] = \
+                    self.query_alarms.get(endpoint, 0) + 1
+
+        if stats.queries > self.query_alarm:
+            self.logger.warning(
+                f"⚠️ {endpoint} issued {stats.queries} queries in one request "
+                f"(alarm at {self.query_alarm}); possible N+1"
+            )
+        return response
+
+    def _before_cursor(self, conn, cursor, statement, parameters,
+                       context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _after_cursor(self, conn, cursor, statement, parameters,
+                      context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_seconds += elapsed
+        if elapsed >= self.slow_query:
+            with self._lock:
+                self.slow_queries += 1
+            params = repr(parameters)
+            if len(params) > 500:
+                params = params[:500] + "…"
+            self.logger.warning(
+                f"🐢 slow query {elapsed * 1000:.1f}ms: {statement} {params}"
+            )
+
+    # ---------------- Exposition ----------------
+
+    def _histogram_lines(self, name, series):
+        for labels, hist in series:
+            cumulative = 0
+            for bound, count in zip(hist.buckets, hist.counts):
+                cumulative += count
+                yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+            yield f'{name}_bucket{{{labels},le="+Inf"}} {hist.total}'
+            yield f"{name}_sum{{{labels}}} {hist.sum}"
+            yield f"{name}_count{{{labels}}} {hist.total}"
+
+    def render(self):
+        """The current worker's metrics in Prometheus text format."""
+        pid = os.getpid()
+        with self._lock:
+            latency = [(_labels(pid=pid, endpoint=e, method=m, status=s), h)
+                       for (e, m, s), h in sorted(self.latency.items())]
+            sql_time = [(_labels(pid=pid, endpoint=e), h)
+                        for e, h in sorted(self.sql_time.items())]
+            query_counts = [(_labels(pid=pid, endpoint=e), h)
+                            for e, h in sorted(self.query_counts.items())]
+            alarms = sorted(self.query_alarms.items())
+            slow = self.slow_queries
+
+        lines = [
+            "# HELP app_request_duration_seconds Request latency per endpoint.",
+            "# TYPE app_request_duration_seconds histogram",
+            *self._histogram_lines("app_request_duration_seconds", latency),
+            "# HELP app_request_sql_seconds SQL time spent per request.",
+            "# TYPE app_request_sql_seconds histogram",
+            *self._histogram_lines("app_request_sql_seconds", sql_time),
+            "# HELP app_request_queries SQL statements issued per request.",
+            "# TYPE app_request_queries histogram",
+            *self._histogram_lines("app_request_queries", query_counts),
+            "# HELP app_query_alarms_total Requests over the query-count alarm.",
+            "# TYPE app_query_alarms_total counter",
+            *(f"app_query_alarms_total{{{_labels(pid=pid, endpoint=e)}}} {n}"
+              for e, n in alarms),
+            "# HELP app_slow_queries_total Statements slower than the threshold.",
+            "# TYPE app_slow_queries_total counter",
+            f"app_slow_queries_total{{{_labels(pid=pid)}}} {slow}",
+        ]
+        return "\n".join(lines) + "\n"
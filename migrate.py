@@ -0,0 +1,115 @@
+# migrate.py
+
+from sqlalchemy import func, inspect, select, text
+from models import db
+from seat_history import record_baseline
+
+# Indexes earlier schemas created that a current composite index covers
+OBSOLETE_INDEXES = {
+    "course": ["ix_course_stream_id"],       # ux_course_stream_name
+    "semester": ["ix_semester_course_id"],   # ux_semester_course_number
+}
+
+
+class MigrationError(Exception):
+    """Existing data blocks an upgrade step and has to be fixed by hand."""
+
+
+def _add_missing_columns(conn, inspector):
+    """ALTER TABLE ... ADD COLUMN for model columns an older schema lacks."""
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue  # create_all() builds it from scratch
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = (f"ALTER TABLE {table.name} ADD COLUMN {column.name} "
+                   f"{column.type.compile(dialect=conn.dialect)}")
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+            if not column.nullable:
+                ddl += " NOT NULL"
+            conn.execute(text(ddl))
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def _check_unique(conn, table, index):
+    """Raise MigrationError if existing rows would break a unique index."""
+    columns = list(index.columns)
+    groups = (
+        select(*columns, func.count().label("copies"))
+        .group_by(*columns)
+        .having(func.count() > 1)
+    )
+    total = conn.execute(
+        select(func.count()).select_from(groups.subquery())
+    ).scalar()
+    if not total:
+        return
+    examples = ", ".join(
+        f"({', '.join(map(str, row[:-1]))}) x{row.copies}"
+        for row in conn.execute(groups.limit(5))
+    )
+    names = ", ".join(c.name for c in columns)
+    raise MigrationError(
+        f"cannot create unique index {index.name}: {total} ({names}) "
+        f"values occur more than once in {table.name}, e.g. {examples}. "
+        f"Merge or delete the duplicate rows, then run the upgrade again."
+    )
+
+
+def _add_missing_indexes(conn, inspector):
+    """CREATE INDEX for model indexes that create_all() skipped on old tables."""
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        missing += [(table, index) for index in table.indexes
+                    if index.name not in existing]
+    # all checks first: SQLite commits each CREATE INDEX on its own
+    for table, index in missing:
+        if index.unique:
+            _check_unique(conn, table, index)
+    for _, index in missing:
+        index.create(conn)
+    return [index.name for _, index in missing]
+
+
+def _drop_obsolete_indexes(conn, inspector):
+    """DROP INDEX for OBSOLETE_INDEXES still present in an old database."""
+    dropped = []
+    for table, names in OBSOLETE_INDEXES.items():
+        if not inspector.has_table(table):
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table)}
+        for name in names:
+            if name in existing:
+                conn.execute(text(f"DROP INDEX {name}"))
+                dropped.append(f"{name} (dropped)")
+    return dropped
+
+
+def upgrade():
+    """
+    Bring an existing database up to the current models without dropping
+    data: new tables, columns and indexes, minus indexes the new ones
+    replace. Safe to run repeatedly; returns the list of changes applied.
+    Raises MigrationError, before any index is created or dropped, when
+    duplicate rows block a unique index.
+    """
+    db.create_all()
+    with db.engine.begin() as conn:
+        inspector = inspect(conn)
+        changes = _add_missing_columns(conn, inspector)
+        changes += _add_missing_indexes(conn, inspector)
+        changes += _drop_obsolete_indexes(conn, inspector)
+    # semesters the history has never seen (a new history table, rows
+    # written before imports were recorded) start from their current seats
+    if record_baseline():
+        changes.append("seat_history baseline")
+    db.session.commit()
+    return changes
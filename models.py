@@ -1,9 +1,14 @@
+import time
+
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 
 db = SQLAlchemy()
 
 class User(db.Model):
+    # login looks users up by (username, role)
+    __table_args__ = (db.Index("ix_user_username_role", "username", "role"),)
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)   # increased length
@@ -23,6 +28,11 @@ class Stream(db.Model):
     )
 
 class Course(db.Model):
+    # one name per stream; also serves lookups by stream_id
+    __table_args__ = (
+        db.Index("ux_course_stream_name", "stream_id", "name", unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     stream_id = db.Column(
@@ -33,9 +43,108 @@ class Course(db.Model):
     )
 
 class Semester(db.Model):
+    # upsert key for catalog imports; also serves lookups by course_id
+    # in semester-number order
+    __table_args__ = (
+        db.Index("ux_semester_course_number", "course_id", "number",
+                 unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     number = db.Column(db.Integer, nullable=False)
     available_seats = db.Column(db.Integer, default=0)
+    # bumped on every seat change; clients send it back for compare-and-set
+    version = db.Column(
+        db.Integer, nullable=False, default=1, server_default="1"
+    )
     course_id = db.Column(
         db.Integer, db.ForeignKey("course.id"), nullable=False
     )
+
+class SeatEvent(db.Model):
+    """
+    Outbox of committed seat changes, read by every worker's event hub.
+    A row without a semester_id tells subscribers to reload everything.
+    """
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    semester_id = db.Column(db.Integer)
+    course_id = db.Column(db.Integer)
+    stream_id = db.Column(db.Integer)
+    available_seats = db.Column(db.Integer)
+    version = db.Column(db.Integer)
+    created_at = db.Column(db.Float, nullable=False, default=time.time)
+
+class SeatHistory(db.Model):
+    """
+    Append-only log of committed seat changes: the state a semester was
+    left in, who left it there and when. Written behind the request by
+    seat_history.HistoryWriter.
+    """
+    # per-semester change log, newest first by id
+    __table_args__ = (
+        db.Index("ix_seat_history_semester", "semester_id", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    semester_id = db.Column(db.Integer, nullable=False)
+    course_id = db.Column(db.Integer, nullable=False)
+    stream_id = db.Column(db.Integer, nullable=False)
+    available_seats = db.Column(db.Integer)
+    version = db.Column(db.Integer)
+    user_id = db.Column(db.Integer)  # None for CLI and system changes
+    changed_at = db.Column(db.Float, nullable=False)
+
+class SeatRollup(db.Model):
+    """
+    Per-semester hourly and daily seat buckets maintained alongside the
+    history, so charts never aggregate raw rows.
+    """
+    __table_args__ = (
+        db.Index("ux_seat_rollup_semester", "granularity", "semester_id",
+                 "bucket_start", unique=True),
+        db.Index("ix_seat_rollup_course", "granularity", "course_id",
+                 "bucket_start"),
+        db.Index("ix_seat_rollup_stream", "granularity", "stream_id",
+                 "bucket_start"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    granularity = db.Column(db.String(8), nullable=False)  # hour/day
+    semester_id = db.Column(db.Integer, nullable=False)
+    course_id = db.Column(db.Integer, nullable=False)
+    stream_id = db.Column(db.Integer, nullable=False)
+    bucket_start = db.Column(db.Integer, nullable=False)  # epoch seconds, UTC
+    changes = db.Column(db.Integer, nullable=False)
+    min_seats = db.Column(db.Integer)
+    max_seats = db.Column(db.Integer)
+    last_seats = db.Column(db.Integer)
+    last_version = db.Column(db.Integer)
+
+class AllocationRound(db.Model):
+    """One committed run of the seat-allocation engine (allocation.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.Float, nullable=False, default=time.time)
+    user_id = db.Column(db.Integer)  # None for CLI runs
+    applicants = db.Column(db.Integer, nullable=False)
+    allocated = db.Column(db.Integer, nullable=False)
+
+class Allocation(db.Model):
+    """
+    A seat given to an applicant. An applicant holds at most one, so later
+    rounds skip everyone already placed.
+    """
+    __table_args__ = (
+        db.Index("ux_allocation_applicant", "applicant", unique=True),
+        db.Index("ix_allocation_round", "round_id", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    round_id = db.Column(
+        db.Integer, db.ForeignKey("allocation_round.id"), nullable=False
+    )
+    applicant = db.Column(db.String(64), nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    semester_id = db.Column(db.Integer, nullable=False)
+    preference = db.Column(db.Integer, nullable=False)  # 1 = first choice
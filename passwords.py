@@ -0,0 +1,78 @@
+# passwords.py
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashPoolBusy(Exception):
+    """Every hashing slot is taken; the caller should answer 503."""
+
+
+class PasswordHasher:
+    """
+    Runs password hashing on a small, bounded thread pool.
+
+    scrypt and pbkdf2 release the GIL, so a handful of hashing threads
+    use real cores while request threads just wait on the result. At most
+    ``workers + queue`` hashes are admitted at once; anything beyond that
+    is refused immediately instead of piling up behind a login burst.
+    """
+
+    def __init__(self, app=None):
+        self.method = None
+        self._prefix = None
+        self._workers = 1
+        self._slots = None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = app.config["PASSWORD_HASH_METHOD"]
+        self._workers = app.config["PASSWORD_HASH_WORKERS"]
+        self._slots = threading.BoundedSemaphore(
+            self._workers + app.config["PASSWORD_HASH_QUEUE"]
+        )
+        app.extensions["password_hasher"] = self
+
+    def _pool(self):
+        # threads don't survive fork, so each worker builds its own pool
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._workers,
+                        thread_name_prefix="pwhash",
+                    )
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashPoolBusy()
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True if ``pwhash`` was made with a different method or cost."""
+        if self._prefix is None:
+            # werkzeug expands "scrypt" to "scrypt:32768:8:1" etc.
+            sample = generate_password_hash("", self.method)
+            self._prefix = sample.split("$", 1)[0]
+        return pwhash.split("$", 1)[0] != self._prefix
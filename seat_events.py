@@ -0,0 +1,222 @@
+# seat_events.py
+
+import queue
+import threading
+import time
+
+from sqlalchemy import delete, func, insert, select
+from models import db, Course, Semester, SeatEvent
+from engines import read_all
+from seat_history import stage_history
+from utils import chunked
+
+# Sentinel delivered to a subscriber that must reload its view
+RESYNC = {"type": "resync"}
+
+
+# ---------------- Outbox ----------------
+
+def record_changes(semester_ids):
+    """
+    Append the current state of ``semester_ids`` to the event outbox.
+    Runs inside the caller's transaction, so events exist iff it commits;
+    the same rows are staged for the seat history.
+    """
+    now = time.time()
+    for chunk in chunked(semester_ids, 500):
+        rows = db.session.execute(
+            insert(SeatEvent).from_select(
+                ["semester_id", "course_id", "stream_id",
+                 "available_seats", "version", "created_at"],
+                select(Semester.id, Semester.course_id, Course.stream_id,
+                       Semester.available_seats, Semester.version,
+                       db.literal(now))
+                .join(Course, Course.id == Semester.course_id)
+                .where(Semester.id.in_(chunk))
+            ).returning(SeatEvent.semester_id, SeatEvent.course_id,
+                        SeatEvent.stream_id, SeatEvent.available_seats,
+                        SeatEvent.version, SeatEvent.created_at)
+        ).all()
+        stage_history(rows)
+
+
+def record_resync():
+    """Tell every subscriber to reload, e.g. after a bulk catalog import."""
+    db.session.add(SeatEvent(created_at=time.time()))
+
+
+def _event_dict(row):
+    return {
+        "id": row.id,
+        "semester_id": row.semester_id,
+        "course_id": row.course_id,
+        "stream_id": row.stream_id,
+        "available_seats": row.available_seats,
+        "version": row.version,
+    }
+
+
+def events_since(last_id, course_id=None, stream_id=None, limit=1000):
+    """Outbox rows after ``last_id``, optionally filtered, oldest first."""
+    stmt = select(SeatEvent).where(SeatEvent.id > last_id)
+    if course_id is not None:
+        stmt = stmt.where((SeatEvent.course_id == course_id) |
+                          SeatEvent.semester_id.is_(None))
+    if stream_id is not None:
+        stmt = stmt.where((SeatEvent.stream_id == stream_id) |
+                          SeatEvent.semester_id.is_(None))
+    rows = read_all(stmt.order_by(SeatEvent.id).limit(limit))
+    return [RESYNC if r.semester_id is None else _event_dict(r) for r in rows]
+
+
+# ---------------- Hub ----------------
+
+class HubFull(Exception):
+    """Every subscriber slot in this worker is taken; answer 503."""
+
+
+class Subscription:
+    """A bounded mailbox for one client, filtered to a course or stream."""
+
+    def __init__(self, maxsize, course_id=None, stream_id=None):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.course_id = course_id
+        self.stream_id = stream_id
+
+    def matches(self, event):
+        if event is RESYNC:
+            return True
+        if self.course_id is not None:
+            return event["course_id"] == self.course_id
+        if self.stream_id is not None:
+            return event["stream_id"] == self.stream_id
+        return True
+
+    def put(self, event):
+        """
+        Deliver without ever blocking the publisher. A subscriber that falls
+        behind loses its backlog and is told to resync instead.
+        """
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            try:
+                while True:
+                    self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.queue.put_nowait(RESYNC)
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class SeatHub:
+    """
+    In-process pub/sub for seat changes. One poller thread per worker
+    watches the catalog version stamp (a stat, no query) and only reads the
+    outbox when another worker, or this one, has committed a change.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._subs = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_id = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions["seat_hub"] = self
+
+    def subscribe(self, course_id=None, stream_id=None):
+        sub = Subscription(self.app.config["SEAT_EVENTS_QUEUE_SIZE"],
+                           course_id=course_id, stream_id=stream_id)
+        with self._lock:
+            if len(self._subs) >= self.app.config["SEAT_EVENTS_MAX_SUBSCRIBERS"]:
+                raise HubFull()
+            if self._last_id is None:
+                # start from "now" so nothing committed after this is missed
+                self._last_id = read_all(
+                    select(func.max(SeatEvent.id))
+                )[0][0] or 0
+            self._subs.add(sub)
+            self._ensure_poller()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subs.discard(sub)
+
+    def publish(self, event):
+        with self._lock:
+            subs = list(self._subs)
+        for sub in subs:
+            if sub.matches(event):
+                sub.put(event)
+
+    # ---------------- Poller ----------------
+
+    def _ensure_poller(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="seat-hub", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        cache = self.app.extensions["catalog_cache"]
+        interval = self.app.config["SEAT_EVENTS_POLL_INTERVAL"]
+        seen_version = None
+        next_prune = 0
+        while True:
+            try:
+                version = cache.version()
+                if version != seen_version:
+                    seen_version = version
+                    with self.app.app_context():
+                        self._poll()
+                        if time.time() >= next_prune:
+                            self._prune()
+                            next_prune = time.time() + 60
+            except Exception:
+                self.app.logger.exception("seat hub poll failed")
+                seen_version = None
+            time.sleep(interval)
+
+    def _poll(self):
+        max_id = read_all(select(func.max(SeatEvent.id)))[0][0] or 0
+        if self._last_id is None:
+            self._last_id = max_id
+            return
+        if max_id < self._last_id:
+            # outbox was dropped and recreated (full-refresh)
+            self._last_id = max_id
+            self.publish(RESYNC)
+            return
+        while self._last_id < max_id:
+            rows = read_all(
+                select(SeatEvent)
+                .where(SeatEvent.id > self._last_id)
+                .order_by(SeatEvent.id)
+                .limit(1000)
+            )
+            if not rows:
+                break
+            for row in rows:
+                self.publish(RESYNC if row.semester_id is None
+                             else _event_dict(row))
+            self._last_id = rows[-1].id
+
+    def _prune(self):
+        cutoff = time.time() - self.app.config["SEAT_EVENTS_RETENTION"]
+        # always keep the newest row so ids keep growing after a prune
+        db.session.execute(delete(SeatEvent).where(
+            SeatEvent.created_at < cutoff, SeatEvent.id < self._last_id
+        ))
+        db.session.commit()
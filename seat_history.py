@@ -0,0 +1,314 @@
+# seat_history.py
+
+import time
+
+from flask import current_app, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import case, event, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from models import db, Course, Semester, SeatHistory, SeatRollup
+from engines import read_all
+from utils import BatchWorker, chunked
+
+GRANULARITIES = {"hour": 3600, "day": 86400}
+
+
+# ---------------- Staging ----------------
+
+def _current_user_id():
+    if not has_request_context():
+        return None
+    try:
+        identity = get_jwt_identity()
+    except RuntimeError:  # no JWT was verified for this request
+        return None
+    return None if identity is None else int(identity)
+
+
+def stage_history(rows):
+    """
+    Remember changed rows on the session, to be queued for the history
+    writer once (and only if) the caller's transaction commits. ``rows``
+    carry semester_id, course_id, stream_id, available_seats, version and
+    created_at, as returned by the outbox insert.
+    """
+    user_id = _current_user_id()
+    db.session.info.setdefault("seat_history", []).extend(
+        {"semester_id": r.semester_id, "course_id": r.course_id,
+         "stream_id": r.stream_id, "available_seats": r.available_seats,
+         "version": r.version, "user_id": user_id,
+         "changed_at": r.created_at}
+        for r in rows
+    )
+
+
+def _rollups(batch):
+    """Fold a batch of history rows into one rollup row per bucket."""
+    buckets = {}
+    for row in sorted(batch, key=lambda r: r["version"] or 0):
+        for name, width in GRANULARITIES.items():
+            start = int(row["changed_at"] // width * width)
+            key = (name, row["semester_id"], start)
+            seats = row["available_seats"] or 0
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = {
+                    "granularity": name, "semester_id": row["semester_id"],
+                    "course_id": row["course_id"],
+                    "stream_id": row["stream_id"], "bucket_start": start,
+                    "changes": 1, "min_seats": seats, "max_seats": seats,
+                    "last_seats": seats, "last_version": row["version"],
+                }
+                continue
+            bucket["changes"] += 1
+            bucket["min_seats"] = min(bucket["min_seats"], seats)
+            bucket["max_seats"] = max(bucket["max_seats"], seats)
+            bucket["last_seats"] = seats
+            bucket["last_version"] = row["version"]
+    return list(buckets.values())
+
+
+def _rollup_upsert_stmt():
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        stmt = sqlite.insert(SeatRollup)
+    elif dialect == "postgresql":
+        stmt = postgresql.insert(SeatRollup)
+    else:
+        raise RuntimeError(f"seat history does not support {dialect}")
+    new = stmt.excluded
+    # batches from different workers can land out of order; the semester
+    # version decides which one holds the latest seat count
+    newer = new.last_version >= SeatRollup.last_version
+    return stmt.on_conflict_do_update(
+        index_elements=["granularity", "semester_id", "bucket_start"],
+        set_={
+            "changes": SeatRollup.changes + new.changes,
+            "min_seats": case((new.min_seats < SeatRollup.min_seats,
+                               new.min_seats), else_=SeatRollup.min_seats),
+            "max_seats": case((new.max_seats > SeatRollup.max_seats,
+                               new.max_seats), else_=SeatRollup.max_seats),
+            "last_seats": case((newer, new.last_seats),
+                               else_=SeatRollup.last_seats),
+            "last_version": case((newer, new.last_version),
+                                 else_=SeatRollup.last_version),
+        },
+    )
+
+
+def _write_batch(batch):
+    """Append history rows and fold them into the rollups; caller commits."""
+    db.session.execute(insert(SeatHistory), batch)
+    db.session.execute(_rollup_upsert_stmt(), _rollups(batch))
+
+
+def record_snapshot(semester_ids):
+    """
+    Write the current seats of ``semester_ids`` to the history inside the
+    caller's transaction. For bulk writers (catalog imports, seeding):
+    they announce themselves with one resync instead of outbox events, and
+    their row counts would overflow the writer's queue.
+    """
+    writer = current_app.extensions.get("seat_history")
+    if writer is None or not writer.enabled:
+        return
+    user_id = _current_user_id()
+    now = time.time()
+    for chunk in chunked(semester_ids, 500):
+        rows = db.session.execute(
+            select(Semester.id, Semester.course_id, Course.stream_id,
+                   Semester.available_seats, Semester.version)
+            .join(Course, Course.id == Semester.course_id)
+            .where(Semester.id.in_(chunk))
+        ).all()
+        if rows:
+            _write_batch([
+                {"semester_id": r.id, "course_id": r.course_id,
+                 "stream_id": r.stream_id,
+                 "available_seats": r.available_seats, "version": r.version,
+                 "user_id": user_id, "changed_at": now}
+                for r in rows
+            ])
+
+
+def record_baseline():
+    """
+    Snapshot every semester with no history yet, so course and stream
+    totals start from real seat counts. Returns how many were written.
+    """
+    untracked = ~select(SeatHistory.id) \
+        .where(SeatHistory.semester_id == Semester.id).exists()
+    ids = db.session.execute(
+        select(Semester.id).where(untracked).order_by(Semester.id)
+    ).scalars().all()
+    record_snapshot(ids)
+    return len(ids)
+
+
+# ---------------- Writer ----------------
+
+class HistoryWriter:
+    """
+    Write-behind sink for seat history. Seat changes are handed over only
+    after their transaction commits, so the request path adds no statement
+    and no commit; a background thread per worker appends them, and folds
+    them into the rollups, in batches of SEAT_HISTORY_BATCH_SIZE or every
+    SEAT_HISTORY_FLUSH_INTERVAL seconds. Rows still queued when a worker
+    is killed outright are lost; the seat counts themselves are not.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self.dropped = 0
+        self._worker = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions["seat_history"] = self
+        self.enabled = app.config["SEAT_HISTORY_ENABLED"]
+        if not self.enabled:
+            return
+        self._worker = BatchWorker(
+            self._write, "seat-history",
+            max_batch=app.config["SEAT_HISTORY_BATCH_SIZE"],
+            max_wait=app.config["SEAT_HISTORY_FLUSH_INTERVAL"],
+            maxsize=app.config["SEAT_HISTORY_QUEUE_SIZE"],
+            drain_at_exit=True,
+        )
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_rollback", self._after_rollback)
+
+    def _after_commit(self, session):
+        rows = session.info.pop("seat_history", None)
+        if rows:
+            self.enqueue(rows)
+
+    def _after_rollback(self, session):
+        session.info.pop("seat_history", None)
+
+    def enqueue(self, rows):
+        for row in rows:
+            if not self._worker.put(row):
+                self.dropped += 1
+                if self.dropped % 1000 == 1:
+                    self.app.logger.warning(
+                        f"⚠️ seat history queue full; {self.dropped} "
+                        f"changes dropped so far"
+                    )
+
+    def flush(self):
+        """Write everything queued in this process now (tests, shutdown)."""
+        if self._worker is not None:
+            self._worker.drain()
+
+    def _write(self, batch):
+        with self.app.app_context():
+            for attempt in range(3):
+                try:
+                    _write_batch(batch)
+                    db.session.commit()
+                    return
+                except Exception:
+                    db.session.rollback()
+                    if attempt == 2:
+                        self.dropped += len(batch)
+                        self.app.logger.exception(
+                            f"seat history write failed; "
+                            f"{len(batch)} changes dropped"
+                        )
+                    else:
+                        time.sleep(0.5 * (attempt + 1))
+                finally:
+                    db.session.remove()
+
+
+# ---------------- Queries ----------------
+
+def semester_series(semester_id, granularity, since, until):
+    """Bucketed min/max/last seats for one semester, oldest first."""
+    rows = read_all(
+        select(SeatRollup.bucket_start, SeatRollup.changes,
+               SeatRollup.min_seats, SeatRollup.max_seats,
+               SeatRollup.last_seats)
+        .where(SeatRollup.granularity == granularity,
+               SeatRollup.semester_id == semester_id,
+               SeatRollup.bucket_start >= since,
+               SeatRollup.bucket_start < until)
+        .order_by(SeatRollup.bucket_start)
+    )
+    return [{"t": r.bucket_start, "changes": r.changes, "min": r.min_seats,
+             "max": r.max_seats, "available_seats": r.last_seats}
+            for r in rows]
+
+
+def _semesters_in(scope, scope_id):
+    if scope == "course":
+        return Semester.course_id == scope_id
+    return Semester.course_id.in_(
+        select(Course.id).where(Course.stream_id == scope_id)
+    )
+
+
+def _last_before(scope, scope_id, granularity, since):
+    """
+    Each semester's seat count at ``since``, from its last earlier bucket:
+    one index seek per semester, however long the history is.
+    """
+    last = (
+        select(SeatRollup.last_seats)
+        .where(SeatRollup.granularity == granularity,
+               SeatRollup.semester_id == Semester.id,
+               SeatRollup.bucket_start < since)
+        .order_by(SeatRollup.bucket_start.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    rows = read_all(select(Semester.id, last)
+                    .where(_semesters_in(scope, scope_id)))
+    return {sid: seats for sid, seats in rows if seats is not None}
+
+
+def group_series(scope, scope_id, granularity, since, until):
+    """
+    Total seats across a course's or stream's semesters per bucket. A
+    semester that did not change in a bucket counts with its last known
+    value; one with no history yet is left out until its first change.
+    """
+    current = _last_before(scope, scope_id, granularity, since)
+    column = SeatRollup.course_id if scope == "course" \
+        else SeatRollup.stream_id
+    rows = read_all(
+        select(SeatRollup.bucket_start, SeatRollup.semester_id,
+               SeatRollup.changes, SeatRollup.last_seats)
+        .where(SeatRollup.granularity == granularity,
+               column == scope_id,
+               SeatRollup.bucket_start >= since,
+               SeatRollup.bucket_start < until)
+        .order_by(SeatRollup.bucket_start)
+    )
+    points = []
+    total = sum(current.values())
+    for row in rows:
+        seats = row.last_seats or 0
+        total += seats - current.get(row.semester_id, 0)
+        current[row.semester_id] = seats
+        if not points or points[-1]["t"] != row.bucket_start:
+            points.append({"t": row.bucket_start, "changes": 0})
+        points[-1]["changes"] += row.changes
+        points[-1]["available_seats"] = total
+    return points
+
+
+def recent_changes(semester_id, before_id=None, limit=100):
+    """Raw history rows for one semester, newest first (keyset on id)."""
+    stmt = select(SeatHistory).where(SeatHistory.semester_id == semester_id)
+    if before_id is not None:
+        stmt = stmt.where(SeatHistory.id < before_id)
+    rows = read_all(stmt.order_by(SeatHistory.id.desc()).limit(limit))
+    return [{"id": r.id, "available_seats": r.available_seats,
+             "version": r.version, "user_id": r.user_id,
+             "changed_at": r.changed_at} for r in rows]
@@ -0,0 +1,224 @@
+# seats.py
+
+from sqlalchemy import case, select, tuple_, update
+from models import db, Course, Semester
+from seat_events import record_changes
+from utils import chunked
+
+# Rows per UPDATE ... CASE statement; keeps bound parameters well under
+# SQLite's variable limit while still amortizing round trips
+BULK_CHUNK = 500
+BULK_RETRIES = 3
+
+
+class SeatUpdateError(Exception):
+    """A seat change was rejected; ``status`` is the HTTP status to return."""
+
+    def __init__(self, message, status, semester=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.semester = semester
+
+
+def _apply(semester_id, values, conditions, conflict):
+    """
+    Run one conditional UPDATE ... RETURNING on a semester and return
+    ``(available_seats, version)``. The condition is evaluated by the
+    database, so concurrent writers can never interleave a read and a write.
+    """
+    stmt = (
+        update(Semester)
+        .where(Semester.id == semester_id, *conditions)
+        .values(version=Semester.version + 1, **values)
+        .returning(Semester.available_seats, Semester.version)
+        .execution_options(synchronize_session=False)
+    )
+    row = db.session.execute(stmt).first()
+    if row is not None:
+        record_changes([semester_id])
+        return tuple(row)
+
+    sem = db.session.get(Semester, semester_id, populate_existing=True)
+    if sem is None:
+        raise SeatUpdateError("Semester not found", 404)
+    raise SeatUpdateError(conflict, 409, sem)
+
+
+def set_seats(semester_id, count, expected_version=None):
+    """
+    Set an absolute seat count. With ``expected_version`` the write only
+    succeeds if nobody changed the semester since the caller read it.
+    """
+    if count < 0:
+        raise SeatUpdateError("Seat count cannot be negative", 400)
+    conditions = []
+    if expected_version is not None:
+        conditions.append(Semester.version == expected_version)
+    return _apply(semester_id, {"available_seats": count}, conditions,
+                  "Semester was modified by someone else")
+
+
+def adjust_seats(semester_id, delta):
+    """
+    Add ``delta`` seats (negative to reserve). Rejected with a 409 if it
+    would take the semester below zero.
+    """
+    return _apply(
+        semester_id,
+        {"available_seats": Semester.available_seats + delta},
+        [Semester.available_seats + delta >= 0],
+        "Not enough seats available",
+    )
+
+
+# ---------------- Bulk updates ----------------
+
+class BulkItem:
+    """One requested change: an absolute ``count`` or a relative ``delta``."""
+
+    __slots__ = ("index", "semester_id", "count", "delta", "status",
+                 "available", "version")
+
+    def __init__(self, semester_id, count=None, delta=None, index=None):
+        self.index = index
+        self.semester_id = semester_id
+        self.count = count
+        self.delta = delta
+        self.status = None
+        self.available = None
+        self.version = None
+
+    def as_dict(self):
+        return {
+            "index": self.index,
+            "semester_id": self.semester_id,
+            "status": self.status,
+            "available": self.available,
+            "version": self.version,
+        }
+
+
+def _plan(items):
+    """
+    Read the current rows in chunks and replay the items against them in
+    order. Returns ``{semester_id: (new_seats, read_version)}`` for rows
+    that change; each item gets its status and resulting seat count.
+    """
+    ids = list({item.semester_id for item in items})
+    current = {}
+    for chunk in chunked(ids, BULK_CHUNK):
+        rows = db.session.execute(
+            select(Semester.id, Semester.available_seats, Semester.version)
+            .where(Semester.id.in_(chunk))
+        )
+        current.update((r.id, (r.available_seats or 0, r.version))
+                       for r in rows)
+
+    seats = {sid: row[0] for sid, row in current.items()}
+    for item in items:
+        if item.semester_id not in current:
+            item.status = "not_found"
+            continue
+        new = item.count if item.delta is None else seats[item.semester_id] + item.delta
+        if new < 0:
+            item.status = "insufficient"
+            item.available = seats[item.semester_id]
+            continue
+        seats[item.semester_id] = new
+        item.status = "updated"
+        item.available = new
+
+    return {sid: (seats[sid], current[sid][1])
+            for sid in {i.semester_id for i in items if i.status == "updated"}}
+
+
+def write_plan(plan):
+    """
+    Apply ``{semester_id: (new_seats, read_version)}`` with one UPDATE ...
+    CASE per chunk, guarded by the versions that were read. Returns
+    ``{semester_id: new_version}`` for the rows that matched.
+    """
+    written = {}
+    for chunk in chunked(plan.items(), BULK_CHUNK):
+        stmt = (
+            update(Semester)
+            .where(
+                # the plain id list lets SQLite seek by primary key; the
+                # row-value IN alone would scan the table
+                Semester.id.in_([sid for sid, _ in chunk]),
+                tuple_(Semester.id, Semester.version).in_(
+                    [(sid, version) for sid, (_, version) in chunk]
+                ),
+            )
+            .values(
+                available_seats=case(
+                    {sid: new for sid, (new, _) in chunk}, value=Semester.id
+                ),
+                version=Semester.version + 1,
+            )
+            .returning(Semester.id, Semester.version)
+            .execution_options(synchronize_session=False)
+        )
+        written.update(tuple(r) for r in db.session.execute(stmt))
+    return written
+
+
+def bulk_update(items, atomic=False):
+    """
+    Apply many seat changes in one transaction. Concurrent edits to any of
+    the rows cause the whole batch to be re-planned (optimistic retry).
+    With ``atomic`` nothing is written unless every item can be applied.
+    The caller commits.
+    """
+    for _ in range(BULK_RETRIES):
+        plan = _plan(items)
+        if atomic and any(item.status != "updated" for item in items):
+            raise SeatUpdateError("Some items could not be applied", 409)
+        written = write_plan(plan)
+        if len(written) == len(plan):
+            record_changes(written)
+            for item in items:
+                if item.status == "updated":
+                    item.version = written[item.semester_id]
+            return items
+        db.session.rollback()
+    raise SeatUpdateError("Semesters kept changing; retry the batch", 409)
+
+
+def apply_rule(count=None, delta=None, course_id=None, stream_id=None):
+    """
+    Set or adjust every semester of a course or stream with one UPDATE.
+    Relative changes skip semesters that would go negative. Returns the
+    updated rows and the ids that were skipped.
+    """
+    if course_id is not None:
+        scope = Semester.course_id == course_id
+    else:
+        scope = Semester.course_id.in_(
+            select(Course.id).where(Course.stream_id == stream_id)
+        )
+
+    if delta is None:
+        if count < 0:
+            raise SeatUpdateError("Seat count cannot be negative", 400)
+        conditions, seats = [scope], count
+    else:
+        conditions = [scope, Semester.available_seats + delta >= 0]
+        seats = Semester.available_seats + delta
+
+    in_scope = db.session.scalars(select(Semester.id).where(scope)).all()
+    if not in_scope:
+        raise SeatUpdateError("No semesters match the rule", 404)
+
+    updated = db.session.execute(
+        update(Semester)
+        .where(*conditions)
+        .values(available_seats=seats, version=Semester.version + 1)
+        .returning(Semester.id, Semester.available_seats, Semester.version)
+        .execution_options(synchronize_session=False)
+    ).all()
+    done = {row.id for row in updated}
+    record_changes(done)
+    skipped = [sid for sid in in_scope if sid not in done]
+    return updated, skipped
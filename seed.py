@@ -1,6 +1,7 @@
 # seed.py
 
 from models import db, User, Stream, Course, Semester
+from seat_history import record_baseline
 
 def seed_users():
     """Create admin & faculty if none exist."""
@@ -55,6 +56,8 @@ def seed_demo_data():
                     available_seats=seats
                 )
             )
+    db.session.flush()
+    record_baseline()
 
 def run():
     """Seed the database within the Flask app context."""
@@ -66,6 +69,7 @@ def run():
         seed_users()
         seed_demo_data()
         db.session.commit()
+        app.extensions["catalog_cache"].bump()
         print("✅ Database seeded successfully")
 
 if __name__ == "__main__":
@@ -0,0 +1,463 @@
+# semester_search.py
+
+import base64
+import bisect
+import json
+import string
+import threading
+import time
+
+from sqlalchemy import and_, func, or_, select
+from models import Stream, Course, Semester, SeatEvent
+from engines import read_all
+
+try:
+    import numpy as np
+except ImportError:  # no index; every search runs against the database
+    np = None
+
+SORTS = ("id", "seats", "number", "course")
+# Sort keys pack (value, id) into one int64, so ids must fit in 32 bits
+ID_SHIFT = 32
+# Above this many changed rows a seat-order re-sort beats patching it
+PATCH_LIMIT = 5000
+# Names match and sort case-insensitively for ASCII only, as SQLite's
+# NOCASE collation does, so the index and the database agree
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+# ---------------- Query ----------------
+
+def _fold(name):
+    """``name`` with A-Z lowercased, the key NOCASE compares on."""
+    return name.translate(_ASCII_LOWER)
+
+
+def _int_arg(args, name):
+    value = args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer") from None
+
+
+class SearchQuery:
+    """Validated filters, sort and keyset position of one search request."""
+
+    __slots__ = ("stream_id", "stream", "course_id", "course", "min_number",
+                 "max_number", "min_seats", "max_seats", "sort", "desc",
+                 "limit", "after")
+
+    @classmethod
+    def from_args(cls, args, default_limit=50, max_limit=500):
+        """Build from request args; raises ValueError on bad input."""
+        q = cls()
+        q.stream_id = _int_arg(args, "stream_id")
+        q.course_id = _int_arg(args, "course_id")
+        q.stream = _fold((args.get("stream") or "").strip()) or None
+        q.course = _fold((args.get("course") or "").strip()) or None
+        q.min_number = _int_arg(args, "min_number")
+        q.max_number = _int_arg(args, "max_number")
+        q.min_seats = _int_arg(args, "min_seats")
+        q.max_seats = _int_arg(args, "max_seats")
+
+        sort = args.get("sort") or "id"
+        q.desc = sort.startswith("-")
+        q.sort = sort.lstrip("-")
+        if q.sort not in SORTS:
+            raise ValueError(f"sort must be one of {', '.join(SORTS)}, "
+                             f"optionally prefixed with -")
+
+        limit = _int_arg(args, "limit")
+        q.limit = default_limit if limit is None else limit
+        if not 1 <= q.limit <= max_limit:
+            raise ValueError(f"limit must be 1-{max_limit}")
+
+        q.after = None
+        if args.get("cursor"):
+            q.after = decode_cursor(args["cursor"], sort)
+        return q
+
+    @property
+    def sort_param(self):
+        return ("-" if self.desc else "") + self.sort
+
+
+def sort_values(sort, row):
+    """The keyset a row sits at under ``sort``; ends with its id."""
+    if sort == "seats":
+        return [row["available_seats"], row["id"]]
+    if sort == "number":
+        return [row["number"], row["id"]]
+    if sort == "course":
+        return [_fold(row["course"]), row["number"], row["id"]]
+    return [row["id"]]
+
+
+def encode_cursor(sort_param, values):
+    raw = json.dumps([sort_param, *values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort_param):
+    """Keyset values from a cursor issued for the same sort."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        token, *values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor") from None
+    if token != sort_param:
+        raise ValueError("Cursor was issued for a different sort")
+    types = [str, int, int] if sort_param.lstrip("-") == "course" else \
+        [int] * (1 if sort_param.lstrip("-") == "id" else 2)
+    if len(values) != len(types) or not all(
+            isinstance(v, t) and not isinstance(v, bool)
+            for v, t in zip(values, types)):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _page(q, rows, source):
+    more = len(rows) > q.limit
+    rows = rows[:q.limit]
+    next_cursor = None
+    if more:
+        next_cursor = encode_cursor(q.sort_param, sort_values(q.sort, rows[-1]))
+    return {"items": rows, "next_cursor": next_cursor, "source": source}
+
+
+# ---------------- Database ----------------
+
+def _keyset(columns, values, desc):
+    """(c1, c2, ...) > (v1, v2, ...) spelled out, or < when descending."""
+    clauses = []
+    for i, column in enumerate(columns):
+        past = column < values[i] if desc else column > values[i]
+        clauses.append(and_(*[c == v for c, v in zip(columns[:i], values)],
+                            past))
+    return or_(*clauses)
+
+
+def search_db(q):
+    """Run a search as one SELECT on the read engine."""
+    seats = func.coalesce(Semester.available_seats, 0)
+    course_name = Course.name.collate("NOCASE")
+    stmt = (
+        select(Semester.id, Semester.number, seats.label("available_seats"),
+               Semester.version, Semester.course_id,
+               Course.name.label("course"), Course.stream_id,
+               Stream.name.label("stream"))
+        .join(Course, Course.id == Semester.course_id)
+        .join(Stream, Stream.id == Course.stream_id)
+    )
+    if q.stream_id is not None:
+        stmt = stmt.where(Course.stream_id == q.stream_id)
+    if q.stream is not None:
+        stmt = stmt.where(Stream.name.collate("NOCASE") == q.stream)
+    if q.course_id is not None:
+        stmt = stmt.where(Semester.course_id == q.course_id)
+    if q.course is not None:
+        # the same range the index bisects
+        stmt = stmt.where(course_name >= q.course,
+                          course_name < q.course + "\U0010ffff")
+    if q.min_number is not None:
+        stmt = stmt.where(Semester.number >= q.min_number)
+    if q.max_number is not None:
+        stmt = stmt.where(Semester.number <= q.max_number)
+    if q.min_seats is not None:
+        stmt = stmt.where(seats >= q.min_seats)
+    if q.max_seats is not None:
+        stmt = stmt.where(seats <= q.max_seats)
+
+    columns = {
+        "id": [Semester.id],
+        "seats": [seats, Semester.id],
+        "number": [Semester.number, Semester.id],
+        "course": [course_name, Semester.number, Semester.id],
+    }[q.sort]
+    if q.after is not None:
+        stmt = stmt.where(_keyset(columns, q.after, q.desc))
+    stmt = stmt.order_by(*[c.desc() if q.desc else c for c in columns])
+    rows = read_all(stmt.limit(q.limit + 1))
+    return _page(q, [dict(r._mapping) for r in rows], "database")
+
+
+# ---------------- Index ----------------
+
+class _Snapshot:
+    """
+    Column arrays for every semester in id order, plus one sorted int64
+    key array and matching row permutation per sort. Never modified once
+    published: seat changes produce a new snapshot sharing the rest.
+    """
+
+    @classmethod
+    def build(cls, rows):
+        s = cls()
+        (ids, numbers, seats, versions, course_ids, course_names,
+         stream_ids, stream_names) = zip(*rows) if rows else ([],) * 8
+        s.ids = np.array(ids, dtype=np.int64)
+        s.numbers = np.array(numbers, dtype=np.int64)
+        s.seats = np.array([v or 0 for v in seats], dtype=np.int64)
+        s.versions = np.array(versions, dtype=np.int64)
+        s.course_ids = np.array(course_ids, dtype=np.int32)
+        s.stream_ids = np.array(stream_ids, dtype=np.int32)
+
+        # course names are filtered by prefix and sorted on as their rank
+        # in the sorted list of distinct folded names
+        s.course_names = dict(zip(course_ids, course_names))
+        s.stream_names = dict(zip(stream_ids, stream_names))
+        s.names = sorted({_fold(name) for name in course_names})
+        rank = {name: i for i, name in enumerate(s.names)}
+        s.course_rank = np.array([rank[_fold(n)] for n in course_names],
+                                 dtype=np.int64)
+        s.streams_by_name = {}
+        for stream_id, name in s.stream_names.items():
+            s.streams_by_name.setdefault(_fold(name), []).append(stream_id)
+        s.number_base = int(s.numbers.max()) + 1 if len(ids) else 1
+
+        s.orders = {}
+        for sort in SORTS:
+            s.orders[sort] = s._sorted(sort)
+        return s
+
+    def _keys(self, sort, rows=slice(None)):
+        ids = self.ids[rows]
+        if sort == "seats":
+            return (self.seats[rows] << ID_SHIFT) | ids
+        if sort == "number":
+            return (self.numbers[rows] << ID_SHIFT) | ids
+        if sort == "course":
+            return ((self.course_rank[rows] * self.number_base
+                     + self.numbers[rows]) << ID_SHIFT) | ids
+        return ids
+
+    def _sorted(self, sort):
+        keys = self._keys(sort)
+        if sort == "id":
+            return keys, np.arange(len(keys), dtype=np.int64)
+        perm = np.argsort(keys, kind="stable")
+        return keys[perm], perm
+
+    def with_seats(self, changes):
+        """
+        A copy with ``{semester_id: (seats, version)}`` applied, or None if
+        a semester is unknown. The seat order is patched in place of a
+        full re-sort when few rows moved.
+        """
+        sids = np.fromiter(changes, dtype=np.int64, count=len(changes))
+        rows = np.searchsorted(self.ids, sids)
+        if len(rows) and (rows.max() >= len(self.ids) or
+                          (self.ids[rows] != sids).any()):
+            return None
+        s = _Snapshot()
+        s.__dict__.update(self.__dict__)
+        s.seats = self.seats.copy()
+        s.versions = self.versions.copy()
+        old_keys = self._keys("seats", rows)
+        values = list(changes.values())
+        s.seats[rows] = [v[0] or 0 for v in values]
+        s.versions[rows] = [v[1] for v in values]
+        s.orders = dict(self.orders)
+        if len(rows) > PATCH_LIMIT:
+            s.orders["seats"] = s._sorted("seats")
+            return s
+
+        keys, perm = self.orders["seats"]
+        drop = np.searchsorted(keys, old_keys)
+        keys, perm = np.delete(keys, drop), np.delete(perm, drop)
+        new_keys = s._keys("seats", rows)
+        order = np.argsort(new_keys)
+        at = np.searchsorted(keys, new_keys[order])
+        s.orders["seats"] = (np.insert(keys, at, new_keys[order]),
+                             np.insert(perm, at, rows[order]))
+        return s
+
+    # ---------------- Search ----------------
+
+    def _cursor_key(self, sort, values):
+        """(key, exact) for a cursor; inexact when its course name is gone."""
+        if sort == "id":
+            return values[0], True
+        if sort != "course":
+            return (values[0] << ID_SHIFT) | values[1], True
+        name, number, sid = values
+        rank = bisect.bisect_left(self.names, name)
+        if rank < len(self.names) and self.names[rank] == name:
+            number = min(max(number, 0), self.number_base - 1)
+            return ((rank * self.number_base + number) << ID_SHIFT) | sid, True
+        return (rank * self.number_base) << ID_SHIFT, False
+
+    def _matcher(self, q):
+        """A function filtering an array of rows, or None if nothing can match."""
+        tests = []
+        if q.stream is not None:
+            stream_ids = self.streams_by_name.get(q.stream)
+            if not stream_ids:
+                return None
+            tests.append(lambda r: np.isin(self.stream_ids[r], stream_ids))
+        if q.stream_id is not None:
+            tests.append(lambda r: self.stream_ids[r] == q.stream_id)
+        if q.course_id is not None:
+            tests.append(lambda r: self.course_ids[r] == q.course_id)
+        if q.course is not None:
+            lo = bisect.bisect_left(self.names, q.course)
+            hi = bisect.bisect_left(self.names, q.course + "\U0010ffff")
+            if lo == hi:
+                return None
+            tests.append(lambda r: (self.course_rank[r] >= lo) &
+                                   (self.course_rank[r] < hi))
+        for column, low, high in ((self.numbers, q.min_number, q.max_number),
+                                  (self.seats, q.min_seats, q.max_seats)):
+            if low is not None:
+                tests.append(lambda r, c=column, v=low: c[r] >= v)
+            if high is not None:
+                tests.append(lambda r, c=column, v=high: c[r] <= v)
+
+        def match(rows):
+            keep = np.ones(len(rows), dtype=bool)
+            for test in tests:
+                keep &= test(rows)
+            return rows[keep]
+        return match
+
+    def search(self, q):
+        """
+        Walk the sort order from the cursor in growing chunks, filtering
+        only the rows visited, until a page plus one row is found. Cost
+        follows the rows scanned, not the size of the catalog.
+        """
+        match = self._matcher(q)
+        if match is None:
+            return _page(q, [], "index")
+        keys, perm = self.orders[q.sort]
+        start, end = 0, len(keys)
+        if q.after is not None:
+            key, exact = self._cursor_key(q.sort, q.after)
+            if q.desc:
+                end = int(np.searchsorted(keys, key, side="left"))
+            else:
+                start = int(np.searchsorted(
+                    keys, key, side="right" if exact else "left"))
+
+        found, want, step = [], q.limit + 1, max(64, 4 * q.limit)
+        while start < end and len(found) < want:
+            if q.desc:
+                chunk = perm[max(start, end - step):end][::-1]
+                end -= len(chunk)
+            else:
+                chunk = perm[start:start + step]
+                start += len(chunk)
+            found.extend(match(chunk)[:want - len(found)].tolist())
+            step = min(step * 4, 1 << 16)
+        return _page(q, [self._row(r) for r in found], "index")
+
+    def _row(self, r):
+        course_id = int(self.course_ids[r])
+        stream_id = int(self.stream_ids[r])
+        return {
+            "id": int(self.ids[r]),
+            "number": int(self.numbers[r]),
+            "available_seats": int(self.seats[r]),
+            "version": int(self.versions[r]),
+            "course_id": course_id,
+            "course": self.course_names[course_id],
+            "stream_id": stream_id,
+            "stream": self.stream_names[stream_id],
+        }
+
+
+class SemesterIndex:
+    """
+    Per-process in-memory index over every semester for
+    /api/semesters/search. It follows the catalog version stamp: seat
+    changes are replayed from the event outbox onto a new snapshot, and a
+    resync event (catalog import, seeding) rebuilds it. Searches fall back
+    to the database while it is disabled, numpy is missing or a build
+    failed.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._snapshot = None
+        self._version = None
+        self._last_id = 0
+        self._synced = 0.0
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+        self.patches = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions["semester_index"] = self
+        self.enabled = app.config["SEARCH_INDEX_ENABLED"] and np is not None
+        # outbox rows older than the retention may be pruned, so a longer
+        # gap since the last sync can't be replayed safely
+        self.max_lag = app.config["SEAT_EVENTS_RETENTION"] / 2
+
+    def get(self):
+        """The current snapshot, or None to search the database instead."""
+        if not self.enabled:
+            return None
+        version = self.app.extensions["catalog_cache"].version()
+        if version != self._version:
+            # one thread syncs; the rest keep serving the previous snapshot
+            if self._lock.acquire(blocking=self._snapshot is None):
+                try:
+                    if version != self._version:
+                        self._sync(version)
+                except Exception:
+                    self.app.logger.exception("semester index sync failed")
+                finally:
+                    self._lock.release()
+        return self._snapshot
+
+    def _sync(self, version):
+        max_id = read_all(select(func.max(SeatEvent.id)))[0][0] or 0
+        if (self._snapshot is None or max_id < self._last_id or
+                time.time() - self._synced > self.max_lag):
+            self._rebuild()
+        elif max_id > self._last_id:
+            rows = read_all(
+                select(SeatEvent.semester_id, SeatEvent.available_seats,
+                       SeatEvent.version)
+                .where(SeatEvent.id > self._last_id, SeatEvent.id <= max_id)
+                .order_by(SeatEvent.id)
+            )
+            changes = {}
+            for row in rows:
+                if row.semester_id is None:
+                    changes = None
+                    break
+                changes[row.semester_id] = (row.available_seats, row.version)
+            snapshot = self._snapshot.with_seats(changes) if changes else None
+            if snapshot is None:
+                self._rebuild()
+            else:
+                self._snapshot = snapshot
+                self.patches += 1
+        self._last_id = max_id
+        self._synced = time.time()
+        self._version = version
+
+    def _rebuild(self):
+        rows = read_all(
+            select(Semester.id, Semester.number, Semester.available_seats,
+                   Semester.version, Semester.course_id, Course.name,
+                   Course.stream_id, Stream.name)
+            .join(Course, Course.id == Semester.course_id)
+            .join(Stream, Stream.id == Course.stream_id)
+            .order_by(Semester.id)
+        )
+        self._snapshot = _Snapshot.build(rows)
+        self.rebuilds += 1
+
+    def search(self, q):
+        snapshot = self.get()
+        if snapshot is None:
+            return search_db(q)
+        return snapshot.search(q)
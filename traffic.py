@@ -0,0 +1,111 @@
+# traffic.py
+
+import json
+import random
+import time
+
+from flask import request
+from utils import BatchWorker
+
+
+# Endpoints whose JSON bodies are kept for replay: seat ids and counts
+# only. Everything else (allocation rounds carry applicant ids and ranks)
+# is recorded by shape alone.
+BODY_ENDPOINTS = frozenset({
+    "main.update_seats", "main.bulk_update_seats",
+    "main.reserve_seats", "main.release_seats",
+})
+
+
+def payload_shape(value, depth=0):
+    """Describe a payload by structure and types only, never by values."""
+    if depth > 4:
+        return "…"
+    if isinstance(value, dict):
+        return {k: payload_shape(v, depth + 1) for k, v in value.items()}
+    if isinstance(value, list):
+        return [len(value), payload_shape(value[0], depth + 1) if value else None]
+    return type(value).__name__
+
+
+class TrafficRecorder:
+    """
+    Samples live requests into a JSONL file for later replay. Requests only
+    pay for a dict build and a non-blocking queue put; a background thread
+    per worker batches the writes. JSON bodies of the seat APIs
+    (BODY_ENDPOINTS) are kept for replay; other JSON bodies are reduced to
+    their shape and form posts, which carry passwords, to their field names.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.dropped = 0
+        self._worker = BatchWorker(self._write, "traffic-writer",
+                                   max_batch=500, max_wait=1.0,
+                                   maxsize=10000, drain_at_exit=True)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["traffic"] = self
+        self.enabled = app.config["TRAFFIC_CAPTURE"]
+        if not self.enabled:
+            return
+        self.path = app.config["TRAFFIC_LOG"]
+        self.rate = app.config["TRAFFIC_SAMPLE_RATE"]
+        self.max_body = app.config["TRAFFIC_MAX_BODY"]
+        self.logger = app.logger
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def _before_request(self):
+        request.environ["traffic.start"] = time.perf_counter()
+
+    def _after_request(self, response):
+        started = request.environ.get("traffic.start")
+        if started is None or random.random() >= self.rate:
+            return response
+
+        record = {
+            "ts": time.time(),
+            "method": request.method,
+            "path": request.full_path.rstrip("?"),
+            "endpoint": request.endpoint or "unmatched",
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            "auth": "Authorization" in request.headers,
+        }
+        if request.is_json:
+            body = request.get_json(silent=True)
+            record["shape"] = payload_shape(body)
+            if request.endpoint in BODY_ENDPOINTS and \
+                    (request.content_length or 0) <= self.max_body:
+                record["json"] = body
+        elif request.form:
+            record["form"] = sorted(request.form.keys())
+        self._enqueue(record)
+        return response
+
+    # ---------------- Writer ----------------
+
+    def _enqueue(self, record):
+        if not self._worker.put(record):
+            self.dropped += 1
+
+    def _write(self, batch):
+        data = "".join(json.dumps(r, separators=(",", ":")) + "\n"
+                       for r in batch)
+        try:
+            # one O_APPEND write per batch keeps workers' lines separate
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(data)
+        except OSError:
+            self.logger.exception("traffic capture write failed")
+
+
+def load_traffic(path):
+    """Read a capture file back into replayable request dicts."""
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,367 @@
+# unemployment.py
+
+import json
+import os
+import time
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:  # ingestion needs both; serving reads JSON rollups only
+    np = pd = None
+
+from utils import write_atomic
+
+# Columns of the notebook's unemployment CSV after header cleanup
+RENAMES = {
+    "Estimated Unemployment Rate (%)": "Unemployment Rate",
+    "Estimated Employed": "Employed",
+    "Estimated Labour Participation Rate (%)": "Labour Participation Rate",
+    "Region.1": "Area",
+}
+METRICS = ["Unemployment Rate", "Employed", "Labour Participation Rate"]
+CATEGORIES = ["Region", "Area", "Frequency"]
+
+COLUMNS_FILE = "unemployment.npz"
+STATE_FILE = "unemployment.json"
+
+
+# ---------------- Ingestion ----------------
+
+def _clean_chunk(chunk):
+    """The notebook's cleanup, plus compact dtypes, for one CSV chunk."""
+    chunk.columns = chunk.columns.str.strip()
+    chunk = chunk.rename(columns=RENAMES)
+    chunk = chunk.drop(columns=["longitude", "latitude"], errors="ignore")
+    chunk = chunk.dropna(subset=["Region", "Date", "Area", *METRICS])
+    for column in CATEGORIES:
+        # strip each distinct value once, not every row
+        codes, uniques = pd.factorize(chunk[column])
+        chunk[column] = np.array([str(u).strip() for u in uniques])[codes]
+    try:
+        chunk["Date"] = pd.to_datetime(chunk["Date"], format="%d-%m-%Y")
+    except ValueError:
+        chunk["Date"] = pd.to_datetime(chunk["Date"], dayfirst=True)
+    return chunk
+
+
+class UnemploymentStore:
+    """
+    Columnar cache and running aggregates for the unemployment dataset.
+
+    Rows live in one .npz of typed columns (category codes, float32 rates,
+    uint32 counts, datetime64 dates). Alongside it, a JSON state file holds
+    per (region, area, month) counts and sums plus the raw moments behind
+    the correlation matrix. Both are additive, so new rows only touch the
+    groups they fall in; nothing already ingested is read again.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.columns_path = os.path.join(cache_dir, COLUMNS_FILE)
+        self.state_path = os.path.join(cache_dir, STATE_FILE)
+
+    def _empty_state(self):
+        k = len(METRICS)
+        return {"version": 0, "rows": 0, "sources": {}, "groups": {},
+                "moments": {"n": 0, "sum": [0.0] * k,
+                            "products": [[0.0] * k for _ in range(k)]},
+                "date_min": None, "date_max": None}
+
+    def load_state(self):
+        try:
+            with open(self.state_path) as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return self._empty_state()
+
+    def load_columns(self):
+        """Cached columns as a dict of arrays plus category lists."""
+        if not os.path.exists(self.columns_path):
+            return None
+        with np.load(self.columns_path, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+
+    def load_frame(self):
+        """The cached rows as a DataFrame with categorical/float32 dtypes."""
+        columns = self.load_columns()
+        if columns is None:
+            return pd.DataFrame(columns=["Region", "Date", "Frequency",
+                                         *METRICS, "Area"])
+        frame = {}
+        for name in CATEGORIES:
+            frame[name] = pd.Categorical.from_codes(
+                columns[f"{name}.codes"], categories=columns[f"{name}.categories"]
+            )
+        frame["Date"] = columns["Date"]
+        for name in METRICS:
+            frame[name] = columns[name]
+        return pd.DataFrame(frame)
+
+    def clear(self):
+        for path in (self.columns_path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def ingest(self, path, chunksize=50000):
+        """
+        Add rows from ``path`` that are not cached yet. Sources are treated
+        as append-only: a file that grew since the last ingest is read from
+        where it left off, and rows already present (same region, area and
+        date) are skipped. Edited rows need ``clear()`` and a re-ingest.
+        Returns a dict of counts; raises RuntimeError without pandas/numpy.
+        """
+        if pd is None:
+            raise RuntimeError("Ingesting needs pandas and numpy; "
+                               "pip install -r requirements.txt")
+        started = time.perf_counter()
+        state = self.load_state()
+        source = os.path.abspath(path)
+        st = os.stat(source)
+        seen = state["sources"].get(source, {})
+        skip = seen.get("rows", 0) if st.st_size >= seen.get("size", 0) else 0
+
+        columns = self.load_columns()
+        keys = _KeyIndex(columns)
+
+        new_parts, read, duplicates = [], 0, 0
+        reader = pd.read_csv(source, chunksize=chunksize,
+                             skipinitialspace=True,
+                             skiprows=range(1, skip + 1))
+        for chunk in reader:
+            read += len(chunk)
+            chunk = _clean_chunk(chunk)
+            if not len(chunk):
+                continue
+            fresh = keys.add_new(chunk)
+            duplicates += len(chunk) - sum(fresh)
+            chunk = chunk[fresh]
+            if len(chunk):
+                self._accumulate(state, chunk)
+                new_parts.append(chunk)
+
+        added = sum(len(part) for part in new_parts)
+        if added:
+            self._save_columns(columns, new_parts)
+        state["sources"][source] = {"rows": skip + read, "size": st.st_size,
+                                    "mtime_ns": st.st_mtime_ns}
+        state["rows"] += added
+        state["version"] += 1
+        os.makedirs(self.cache_dir, exist_ok=True)
+        write_atomic(self.state_path, lambda fh: fh.write(
+            json.dumps(state, separators=(",", ":")).encode("utf-8")
+        ))
+        return {"read": read, "added": added, "duplicates": duplicates,
+                "skipped": skip, "rows": state["rows"],
+                "seconds": time.perf_counter() - started}
+
+    def _accumulate(self, state, chunk):
+        """Fold a clean chunk into the group sums and correlation moments."""
+        month = chunk["Date"].values.astype("datetime64[M]")
+        sums = chunk.groupby([chunk["Region"], chunk["Area"], month],
+                             observed=True)[METRICS].agg(["count", "sum"])
+        groups = state["groups"]
+        # columns alternate (metric, count), (metric, sum)
+        for (region, area, ym), row in zip(sums.index,
+                                           sums.to_numpy().tolist()):
+            key = f"{region}|{area}|{str(ym)[:7]}"
+            count, totals = int(row[0]), row[1::2]
+            current = groups.get(key)
+            if current is None:
+                groups[key] = [count, *totals]
+            else:
+                current[0] += count
+                for i, total in enumerate(totals, 1):
+                    current[i] += total
+
+        values = chunk[METRICS].to_numpy(dtype=np.float64)
+        moments = state["moments"]
+        moments["n"] += len(values)
+        moments["sum"] = (np.asarray(moments["sum"]) +
+                          values.sum(axis=0)).tolist()
+        moments["products"] = (np.asarray(moments["products"]) +
+                               values.T @ values).tolist()
+
+        first = chunk["Date"].min().strftime("%Y-%m-%d")
+        last = chunk["Date"].max().strftime("%Y-%m-%d")
+        state["date_min"] = min(filter(None, [state["date_min"], first]))
+        state["date_max"] = max(filter(None, [state["date_max"], last]))
+
+    def _save_columns(self, columns, parts):
+        """
+        Append ``parts`` to the cached columns. Existing category codes are
+        kept; values not seen before get new codes at the end.
+        """
+        arrays = {}
+        for name in CATEGORIES:
+            categories = list(columns[f"{name}.categories"]) if columns else []
+            index = {value: i for i, value in enumerate(categories)}
+            new_codes = []
+            for part in parts:
+                for value in pd.unique(part[name]):
+                    if value not in index:
+                        index[value] = len(categories)
+                        categories.append(value)
+                new_codes.append(part[name].map(index).to_numpy(np.int16))
+            old = [columns[f"{name}.codes"]] if columns else []
+            arrays[f"{name}.categories"] = np.array(categories, dtype=str)
+            arrays[f"{name}.codes"] = np.concatenate(old + new_codes)
+
+        old = [columns["Date"]] if columns else []
+        arrays["Date"] = np.concatenate(
+            old + [p["Date"].values.astype("datetime64[D]") for p in parts]
+        )
+        for name in METRICS:
+            dtype = np.uint32 if name == "Employed" else np.float32
+            old = [columns[name]] if columns else []
+            arrays[name] = np.concatenate(
+                old + [p[name].to_numpy(dtype) for p in parts]
+            )
+        os.makedirs(self.cache_dir, exist_ok=True)
+        write_atomic(self.columns_path, lambda fh: np.savez(fh, **arrays))
+
+
+class _KeyIndex:
+    """
+    (region, area, date) keys of cached rows, for de-duplication. Keys are
+    only expanded for cached rows at or after the oldest incoming date, so
+    appending new months doesn't decode the whole history.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.loaded_from = None
+        self.keys = set()
+
+    def _load_since(self, start):
+        if self.columns is None:
+            return
+        dates = self.columns["Date"]
+        mask = dates >= start
+        if self.loaded_from is not None:
+            mask &= dates < self.loaded_from
+        if not mask.any():
+            return
+        region = self.columns["Region.categories"][
+            self.columns["Region.codes"][mask]]
+        area = self.columns["Area.categories"][self.columns["Area.codes"][mask]]
+        self.keys.update(zip(region.tolist(), area.tolist(),
+                             dates[mask].tolist()))
+
+    def add_new(self, chunk):
+        """Mask of chunk rows not seen before; remembers them."""
+        dates = chunk["Date"].values.astype("datetime64[D]")
+        start = dates.min()
+        if self.loaded_from is None or start < self.loaded_from:
+            self._load_since(start)
+            self.loaded_from = start
+        fresh = []
+        for key in zip(chunk["Region"].tolist(), chunk["Area"].tolist(),
+                       dates.tolist()):
+            fresh.append(key not in self.keys)
+            self.keys.add(key)
+        return fresh
+
+
+# ---------------- Results ----------------
+
+def _means(count, totals):
+    return {name: round(total / count, 4) if count else None
+            for name, total in zip(METRICS, totals)}
+
+
+def _rollup(groups, key_of):
+    """Sum ``(region, area, month, sums)`` rows under ``key_of(...)``."""
+    out = {}
+    for region, area, month, sums in groups:
+        key = key_of(region, area, month)
+        bucket = out.get(key)
+        if bucket is None:
+            out[key] = list(sums)
+        else:
+            for i, value in enumerate(sums):
+                bucket[i] += value
+    return out
+
+
+def _correlation(moments):
+    n = moments["n"]
+    if n < 2:
+        return None
+    k = len(METRICS)
+    mean = [s / n for s in moments["sum"]]
+    cov = [[moments["products"][i][j] / n - mean[i] * mean[j]
+            for j in range(k)] for i in range(k)]
+    corr = [[None] * k for _ in range(k)]
+    for i in range(k):
+        for j in range(k):
+            denom = (cov[i][i] * cov[j][j]) ** 0.5
+            corr[i][j] = round(cov[i][j] / denom, 4) if denom else None
+    return {"columns": METRICS, "matrix": corr}
+
+
+def build_results(state):
+    """Every published view, derived from the group sums alone."""
+    groups = [(*key.split("|"), sums) for key, sums in state["groups"].items()]
+    regions = _rollup(groups, lambda r, a, m: (r, a))
+    areas = _rollup(groups, lambda r, a, m: a)
+    months = _rollup(groups, lambda r, a, m: m)
+    by_region_month = _rollup(groups, lambda r, a, m: (r, m))
+    rate = METRICS[0]
+
+    region_rows = sorted(
+        ({"region": r, "area": a, "rows": c, **_means(c, t)}
+         for (r, a), (c, *t) in regions.items()),
+        key=lambda row: -row[rate],
+    )
+    area_rows = sorted(
+        ({"area": a, "rows": c, **_means(c, t)}
+         for a, (c, *t) in areas.items()),
+        key=lambda row: -row[rate],
+    )
+    monthly = [{"month": m, "rows": c, **_means(c, t)}
+               for m, (c, *t) in sorted(months.items())]
+    region_monthly = {}
+    for (r, m), (c, *t) in sorted(by_region_month.items()):
+        region_monthly.setdefault(r, []).append(
+            {"month": m, "rows": c, **_means(c, t)}
+        )
+    return {
+        "summary": {"rows": state["rows"], "version": state["version"],
+                    "date_min": state["date_min"],
+                    "date_max": state["date_max"],
+                    "regions": len(region_rows), "areas": len(area_rows)},
+        "regions": region_rows,
+        "areas": area_rows,
+        "monthly": monthly,
+        "region_monthly": region_monthly,
+        "correlation": _correlation(state["moments"]),
+    }
+
+
+class UnemploymentAnalytics:
+    """
+    Serves the precomputed unemployment views. Each worker derives them
+    once per state file version; requests only pick from a dict.
+    """
+
+    def __init__(self, app=None):
+        self.results = None
+        self._mtime = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["unemployment"] = self
+        self.store = UnemploymentStore(app.config["UNEMPLOYMENT_CACHE_DIR"])
+
+    def get(self):
+        """Current results, or None before the first ingest."""
+        try:
+            mtime = os.stat(self.store.state_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime != self._mtime:
+            self.results = build_results(self.store.load_state())
+            self._mtime = mtime
+        return self.results
@@ -0,0 +1,133 @@
+# utils.py
+
+import atexit
+import os
+import queue
+import threading
+import time
+
+
+def chunked(iterable, size):
+    """Lists of up to ``size`` items from ``iterable``, in order."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ---------------- Files ----------------
+
+def write_atomic(path, write):
+    """
+    Replace ``path`` with what ``write(fh)`` writes to a binary file, via a
+    temp file and ``os.replace``: readers see the old file or the new one,
+    never a partial write.
+    """
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as fh:
+        write(fh)
+    os.replace(tmp, path)
+
+
+# ---------------- Background batches ----------------
+
+_STOP = object()
+
+
+class BatchWorker:
+    """
+    A per-process queue drained by one daemon thread, which hands
+    ``handle`` batches of up to ``max_batch`` items, waiting at most
+    ``max_wait`` seconds for a batch to fill (0: only what is already
+    queued). Threads don't survive fork, so the thread starts lazily in
+    each process on its first ``put``. With ``drain_at_exit``, the batch in
+    hand and everything still queued are handled at interpreter exit.
+    ``handle`` must not raise.
+    """
+
+    def __init__(self, handle, name, max_batch, max_wait, maxsize=0,
+                 drain_at_exit=False):
+        self.handle = handle
+        self.name = name
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.maxsize = maxsize
+        self.drain_at_exit = drain_at_exit
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if drain_at_exit:
+            atexit.register(self.drain)
+
+    def put(self, item):
+        """Queue ``item``; False if the queue is full."""
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            return False
+        return True
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.maxsize)
+            self._thread = threading.Thread(
+                target=self._run, args=(self._queue,), name=self.name,
+                daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self, q):
+        while True:
+            item = q.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = q.get(timeout=remaining) if remaining > 0 \
+                        else q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self.handle(batch)
+                    return
+                batch.append(item)
+            self.handle(batch)
+
+    def drain(self, timeout=10):
+        """
+        Handle everything queued in this process now and stop the thread;
+        the next ``put`` starts a fresh one (tests, shutdown).
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            self._pid = None
+            q = self._queue
+            try:
+                q.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+            # puts that raced the stop marker
+            batch = []
+            try:
+                while True:
+                    item = q.get_nowait()
+                    if item is not _STOP:
+                        batch.append(item)
+            except queue.Empty:
+                pass
+            for chunk in chunked(batch, self.max_batch):
+                self.handle(chunk)